@@ -2,17 +2,30 @@
 # floating_calendar_full_projects.py
 # Requires: pip install PyQt6
 #PVTDung2512
+import time
+_T_START = time.perf_counter()  # --startup-profile measures imports from here
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QCalendarWidget, QFileDialog, QMessageBox,
-    QSystemTrayIcon, QMenu, QAction, QSizePolicy
+    QSystemTrayIcon, QMenu, QSizePolicy, QTableView, QProgressDialog, QAbstractScrollArea, QLineEdit,
+    QListView, QAbstractItemView
+)
+from PyQt6.QtCore import (
+    Qt, QDate, QDateTime, QTime, QObject, QPoint, QEvent, QRect, QTimer, QThread, pyqtSignal,
+    QFileSystemWatcher, QAbstractListModel, QModelIndex
 )
-from PyQt6.QtCore import Qt, QDate, QPoint, QEvent, QRect
 from PyQt6.QtGui import (
     QCursor, QGuiApplication, QTextCharFormat, QColor, QIcon,
-    QPixmap, QPainter, QKeySequence, QFont
+    QPixmap, QPainter, QKeySequence, QFont, QAction, QPen, QRegion
 )
-import sys, csv
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+import sys, os, re, csv, json, sqlite3, heapq, hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from itertools import accumulate
+from datetime import date as _date
+_T_IMPORTED = time.perf_counter()
 
 # -----------------------
 # Palette for statuses / project types (you can change these hex codes)
@@ -30,141 +43,4273 @@ PALETTE = {
     "Today":        "#38bdf8",  # cyan (special)
 }
 
-# Grey placeholder for empty cells in 3x3 grid
-GRID_PLACEHOLDER = "#26303a"  # dark grey placeholder
+# Project types that already describe a status rather than a kind of work
+STATUS_TYPES = ("Completed", "Overdue", "Delay", "Tentative")
+
+# Grey placeholder for empty cells in 3x3 grid
+GRID_PLACEHOLDER = "#26303a"  # dark grey placeholder
+
+# Project types are interned to small integer ids (PALETTE order first), so
+# records, per-day entries and cache keys carry ints instead of strings.
+TYPE_NAMES = []
+_TYPE_IDS = {}
+
+def intern_type(name):
+    tid = _TYPE_IDS.get(name)
+    if tid is None:
+        tid = _TYPE_IDS[name] = len(TYPE_NAMES)
+        TYPE_NAMES.append(name)
+    return tid
+
+for _name in PALETTE:
+    intern_type(_name)
+
+def type_color(tid):
+    return PALETTE.get(TYPE_NAMES[tid], PALETTE["Extra"])
+
+_QCOLOR_CACHE = {}
+
+def qcolor(hexstr):
+    # QColor parsing is not free and paint paths ask for the same few colours
+    c = _QCOLOR_CACHE.get(hexstr)
+    if c is None:
+        c = _QCOLOR_CACHE[hexstr] = QColor(hexstr)
+    return c
+
+def color_swatch_pix(hexcolor, size=14):
+    pix = QPixmap(size, size)
+    pix.fill(Qt.GlobalColor.transparent)
+    p = QPainter(pix)
+    p.setPen(Qt.GlobalColor.transparent)
+    p.setBrush(qcolor(hexcolor))
+    p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    p.drawRoundedRect(0, 0, size-1, size-1, 3, 3)
+    p.end()
+    return pix
+
+# Julian day number of date.min, used to convert datetime.date ordinals
+_JD_ORDINAL_OFFSET = 1721425
+
+def to_jd(value):
+    """Julian day number for a QDate, datetime.date, 'yyyy-MM-dd' string or int."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, QDate):
+        return value.toJulianDay()
+    if isinstance(value, str):
+        d = QDate.fromString(value, "yyyy-MM-dd")
+        if not d.isValid():
+            raise ValueError(f"invalid date: {value!r}")
+        return d.toJulianDay()
+    return value.toordinal() + _JD_ORDINAL_OFFSET
+
+def jd_to_qdate(jd):
+    return QDate.fromJulianDay(jd)
+
+def jd_to_iso(jd):
+    # plain datetime is cheaper than QDate for bulk formatting (and thread-agnostic)
+    return _date.fromordinal(jd - _JD_ORDINAL_OFFSET).isoformat()
+
+def project_status(ptype, end=None, today=None, done=False):
+    """Completed / Overdue / Active derived from the completion flag and the
+    date range (overdue: not done and ended before today). Types that already
+    name a status (STATUS_TYPES, e.g. Tentative) keep it."""
+    if done:
+        return "Completed"
+    if ptype in STATUS_TYPES:
+        return ptype
+    if today is not None and end < today:
+        return "Overdue"
+    return "Active"
+
+# derived statuses are painted in their own colour instead of the project type's
+_STATUS_TIDS = {s: intern_type(s) for s in ("Completed", "Overdue")}
+
+def display_tid(p, today):
+    return _STATUS_TIDS.get(project_status(p.ptype, p.end, today, p.done), p.tid)
+
+def cut_range(start, end, lo, hi):
+    """Pieces of [start, end] left after cutting out [lo, hi] (0, 1 or 2 ranges)."""
+    pieces = []
+    if start < lo:
+        pieces.append((start, min(end, lo - 1)))
+    if end > hi:
+        pieces.append((max(start, hi + 1), end))
+    return pieces
+
+# -----------------------
+# Project store: project records with start/end days, indexed by date range
+# -----------------------
+def _norm_row(row):
+    name, ptype, start, end = row
+    start = to_jd(start)
+    end = start if end is None else to_jd(end)
+    return (name, ptype, start, end) if start <= end else (name, ptype, end, start)
+
+
+class Project:
+    __slots__ = ("pid", "name", "tid", "start", "end", "done")
+
+    def __init__(self, pid, name, ptype, start, end, done=False):
+        self.pid = pid
+        self.name = name
+        self.tid = intern_type(ptype)
+        self.start = start  # Julian day, inclusive
+        self.end = end      # Julian day, inclusive
+        self.done = done    # completion flag; see project_status
+
+    @property
+    def ptype(self):
+        return TYPE_NAMES[self.tid]
+
+    @ptype.setter
+    def ptype(self, name):
+        self.tid = intern_type(name)
+
+    def __repr__(self):
+        return (f"Project({self.pid}, {self.name!r}, {self.ptype!r}, "
+                f"{jd_to_qdate(self.start).toString('yyyy-MM-dd')}..{jd_to_qdate(self.end).toString('yyyy-MM-dd')})")
+
+
+def sweep_days(records, lo, hi, start=lambda r: r.start, end=lambda r: r.end, key=lambda r: r.pid):
+    """Yield (jd, records active on jd, ordered by key) for every day in [lo, hi].
+
+    Records are swept in start order with a heap of the active ones, so memory
+    is bounded by how many overlap on a day, not by the length of the range.
+    """
+    pending = sorted(records, key=start)
+    i = 0
+    active = []  # heap of (end, key, n, record)
+    for jd in range(lo, hi + 1):
+        while i < len(pending) and start(pending[i]) <= jd:
+            r = pending[i]
+            heapq.heappush(active, (end(r), key(r), i, r))
+            i += 1
+        while active and active[0][0] < jd:
+            heapq.heappop(active)
+        if active:
+            yield jd, [a[3] for a in sorted(active, key=lambda a: a[1])]
+        else:
+            yield jd, ()
+
+
+class CompactDayMap:
+    """Read-only Julian day -> project-type ids map stored in three flat arrays.
+
+    days (int32, ascending), offsets (uint32) and type ids (uint16): about
+    8 bytes per day plus 2 per entry, where a dict of string-keyed lists costs
+    well over 100 bytes per day. Lookups are a bisect over days.
+    """
+    __slots__ = ("days", "offsets", "ids")
+
+    def __init__(self, items=()):
+        # items: (jd, iterable of type ids) in ascending jd order
+        self.days = array("i")
+        self.offsets = array("I", [0])
+        self.ids = array("H")
+        for jd, tids in items:
+            self.days.append(jd)
+            self.ids.extend(tids)
+            self.offsets.append(len(self.ids))
+
+    @classmethod
+    def from_legacy(cls, project_map):
+        """From a {'YYYY-MM-DD': [types]} map."""
+        days = sorted((to_jd(k), v) for k, v in project_map.items() if v)
+        return cls((jd, [intern_type(t) for t in types]) for jd, types in days)
+
+    def __len__(self):
+        return len(self.days)
+
+    def entry_count(self):
+        return len(self.ids)
+
+    def get(self, jd):
+        """Type ids on jd (a tuple, empty when the day has nothing)."""
+        i = bisect_left(self.days, jd)
+        if i < len(self.days) and self.days[i] == jd:
+            return tuple(self.ids[self.offsets[i]:self.offsets[i + 1]])
+        return ()
+
+    def items(self):
+        ids, offsets = self.ids, self.offsets
+        for i, jd in enumerate(self.days):
+            yield jd, tuple(ids[offsets[i]:offsets[i + 1]])
+
+    def names(self, jd):
+        return [TYPE_NAMES[t] for t in self.get(jd)]
+
+
+class _IntervalLevel:
+    """Static implicit interval tree (cgranges layout) over entries sorted by start.
+
+    Node i sits at level k when its k lowest bits are 1; maxend[i] is the
+    largest end day in its subtree. Built bottom-up in O(n) after the sort.
+    """
+    __slots__ = ("starts", "ends", "maxend", "projs", "tokens", "root_k", "max_end")
+
+    def __init__(self, entries):
+        # entries: (start, token, end, project), sorted
+        self.starts = [e[0] for e in entries]
+        self.tokens = [e[1] for e in entries]
+        self.ends = [e[2] for e in entries]
+        self.projs = [e[3] for e in entries]
+        self.maxend = list(self.ends)
+        self.max_end = max(self.ends) if entries else None
+        n = len(entries)
+        maxend = self.maxend
+        last_i = last = 0
+        for i in range(0, n, 2):
+            last_i, last = i, maxend[i]
+        k = 1
+        while (1 << k) <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                e = maxend[i]
+                el = maxend[i - x]
+                er = maxend[i + x] if i + x < n else last
+                if el > e: e = el
+                if er > e: e = er
+                maxend[i] = e
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and maxend[last_i] > last:
+                last = maxend[last_i]
+            k += 1
+        self.root_k = k - 1
+
+    def __len__(self):
+        return len(self.starts)
+
+    def entries(self):
+        return zip(self.starts, self.tokens, self.ends, self.projs)
+
+    def query(self, lo, hi, live, out):
+        """Append projects whose entry overlaps [lo, hi] and is still current in live."""
+        n = len(self.starts)
+        if not n:
+            return
+        starts, ends, maxend, projs, tokens = self.starts, self.ends, self.maxend, self.projs, self.tokens
+        stack = [(self.root_k, (1 << self.root_k) - 1, 0)]
+        while stack:
+            k, x, w = stack.pop()
+            if k <= 3:
+                # small subtree: scan it linearly
+                i0 = x >> k << k
+                i1 = min(i0 + (1 << (k + 1)) - 1, n)
+                for i in range(i0, i1):
+                    if starts[i] > hi:
+                        break
+                    if ends[i] >= lo and live.get(projs[i].pid) == tokens[i]:
+                        out.append(projs[i])
+            elif w == 0:
+                y = x - (1 << (k - 1))  # left child; may be past the end
+                stack.append((k, x, 1))
+                if y >= n or maxend[y] >= lo:
+                    stack.append((k - 1, y, 0))
+            elif x < n and starts[x] <= hi:
+                if ends[x] >= lo and live.get(projs[x].pid) == tokens[x]:
+                    out.append(projs[x])
+                stack.append((k - 1, x + (1 << (k - 1)), 0))
+
+
+class ProjectStore:
+    """Project records indexed by their [start, end] day range.
+
+    The index is log-structured: a few static interval trees (_IntervalLevel)
+    of geometrically decreasing size. New or changed records are indexed on
+    the next query as a small level that is merged with its neighbours once
+    they are of similar size, so adding a batch costs O(batch log n) amortised
+    instead of a full rebuild. An overlap query for a day or a visible month
+    costs O(log^2 n + k). Removed or changed records leave stale entries that
+    are skipped and dropped at the next merge.
+    Within a day, projects are listed in creation order.
+
+    Listeners are called as fn(lo, hi) *before* any mutation touching the day
+    range [lo, hi], so views can snapshot what they show and diff afterwards.
+    While `reloading` is set the notification only means the in-memory copy is
+    being reloaded (DatabaseProjectStore), not that any data changes; while
+    `rules_changing` is set it is about recurring rules, not records.
+
+    Recurring projects are kept as rules (self.rules) and never stored as
+    records; query(..., recurring=True) and export_records(..., recurring=True)
+    add their occurrences for the range asked for.
+    """
+    reloading = False
+    rules_changing = False
+
+    def __init__(self):
+        self._projects = {}  # pid -> Project
+        self._next_pid = 1
+        self._listeners = []
+        self.rules = RecurrenceSet()
+        self._reset_index()
+
+    def _reset_index(self):
+        self._levels = []    # _IntervalLevel, largest first
+        self._live = {}      # pid -> token of the entry currently describing it
+        self._pending = {}   # pid -> Project not indexed yet
+        self._next_token = 0
+        self._garbage = 0    # stale entries still held by levels
+
+    def _touch(self, p):
+        """Re-index p after its range changed (or it was just created)."""
+        if self._live.pop(p.pid, None) is not None:
+            self._garbage += 1
+        self._pending[p.pid] = p
+
+    def _forget(self, pid):
+        if self._live.pop(pid, None) is not None:
+            self._garbage += 1
+        self._pending.pop(pid, None)
+
+    def __len__(self):
+        return len(self._projects)
+
+    def __iter__(self):
+        return iter(self._projects.values())
+
+    def get(self, pid):
+        return self._projects.get(pid)
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, lo, hi):
+        for fn in self._listeners:
+            fn(lo, hi)
+
+    def bounds(self):
+        """(first start, last end) over all projects, or None when empty.
+        May be conservative (wider) while stale index entries are around."""
+        if not self._projects:
+            return None
+        self._flush()
+        levels = [lv for lv in self._levels if len(lv)]
+        return min(lv.starts[0] for lv in levels), max(lv.max_end for lv in levels)
+
+    def add(self, name, ptype, start, end=None):
+        start = to_jd(start)
+        end = start if end is None else to_jd(end)
+        if end < start:
+            start, end = end, start
+        self._notify(start, end)
+        return self._insert(name, ptype, start, end)
+
+    def add_many(self, rows):
+        """Add (name, ptype, start, end) rows with a single change notification."""
+        rows = [_norm_row(r) for r in rows]
+        if not rows:
+            return 0
+        self._notify(min(r[2] for r in rows), max(r[3] for r in rows))
+        for r in rows:
+            self._insert(*r)
+        return len(rows)
+
+    def apply_delta(self, remove_pids=(), add_rows=()):
+        """Remove projects and add (name, ptype, start, end) rows; listeners are
+        told each touched range, so the cost follows the size of the delta.
+        Returns the pids of the added projects."""
+        rows = [_norm_row(r) for r in add_rows]
+        gone = [self._projects[pid] for pid in remove_pids if pid in self._projects]
+        for p in gone:
+            self._notify(p.start, p.end)
+        for r in rows:
+            self._notify(r[2], r[3])
+        for p in gone:
+            del self._projects[p.pid]
+            self._forget(p.pid)
+        return [self._insert(*r).pid for r in rows]
+
+    def restore(self, remove_pids, records):
+        """Remove pids, then put export_records() tuples back under their own pids (undo / redo)."""
+        remove_pids = [pid for pid in remove_pids if pid in self._projects]
+        for pid in remove_pids:
+            p = self._projects[pid]
+            self._notify(p.start, p.end)
+        for r in records:
+            self._notify(r[3], r[4])
+        for pid in remove_pids:
+            del self._projects[pid]
+            self._forget(pid)
+        for pid, name, ptype, start, end, done in records:
+            if pid in self._projects:
+                self._forget(pid)
+            self._insert(name, ptype, start, end, pid, done)
+
+    def _insert(self, name, ptype, start, end, pid=None, done=False):
+        if pid is None:
+            pid = self._next_pid
+        self._next_pid = max(self._next_pid, pid + 1)
+        p = Project(pid, name, ptype, start, end, done)
+        self._projects[p.pid] = p
+        self._pending[p.pid] = p
+        return p
+
+    def remove(self, pid):
+        p = self._projects.get(pid)
+        if p is not None:
+            self._notify(p.start, p.end)
+            del self._projects[pid]
+            self._forget(pid)
+        return p
+
+    def update(self, pid, **fields):
+        p = self._projects[pid]
+        old = (p.start, p.end)
+        fields = {k: (to_jd(v) if k in ("start", "end") else v) for k, v in fields.items()}
+        start = fields.get("start", p.start)
+        end = fields.get("end", p.end)
+        if end < start:
+            fields["start"], fields["end"] = end, start
+        self._notify(min(old[0], start, end), max(old[1], start, end))
+        for k, v in fields.items():
+            setattr(p, k, v)
+        if (p.start, p.end) != old:
+            self._touch(p)
+        return p
+
+    def remove_range(self, lo, hi=None, ptype=None):
+        """Cut the days [lo, hi] out of every project (of ptype, if given).
+
+        Projects inside the range are removed, projects overlapping one edge
+        are trimmed and projects spanning the whole range are split in two.
+        Returns the number of projects touched.
+        """
+        lo = to_jd(lo)
+        hi = lo if hi is None else to_jd(hi)
+        if hi < lo:
+            lo, hi = hi, lo
+        hits = [p for p in self.query(lo, hi) if ptype is None or p.ptype == ptype]
+        if not hits:
+            return 0
+        # whole extents: trimmed and split records change outside [lo, hi] too
+        self._notify(min(p.start for p in hits), max(p.end for p in hits))
+        for p in hits:
+            pieces = cut_range(p.start, p.end, lo, hi)
+            if not pieces:
+                del self._projects[p.pid]
+                self._forget(p.pid)
+                continue
+            p.start, p.end = pieces[0]
+            self._touch(p)
+            if len(pieces) == 2:
+                self._insert(p.name, p.ptype, *pieces[1], done=p.done)
+        return len(hits)
+
+    def mark_done(self, lo, hi=None, done=True):
+        """Set the completion flag of every project overlapping [lo, hi].
+        Returns the number of projects changed."""
+        lo = to_jd(lo)
+        hi = lo if hi is None else to_jd(hi)
+        if hi < lo:
+            lo, hi = hi, lo
+        n = self._mark_rules_done(lo, hi, done)
+        hits = [p for p in self.query(lo, hi) if p.done != done]
+        if not hits:
+            return n
+        self._notify(min(p.start for p in hits), max(p.end for p in hits))
+        for p in hits:
+            p.done = done
+        return n + len(hits)
+
+    def _mark_rules_done(self, lo, hi, done):
+        """Mark (or reopen) the rule occurrences overlapping [lo, hi]; returns how many changed."""
+        n = 0
+        for rule in self.rules:
+            days = {s for s in rule.starts(lo - rule.length + 1, hi)
+                    if s not in rule.exceptions and (s in rule.completed) != done}
+            if days:
+                self.update_rule(rule.rid, completed=rule.completed | days if done else rule.completed - days)
+                n += len(days)
+        return n
+
+    # Recurring projects (see RecurrenceRule). Rule changes are reported to
+    # listeners over the whole series with rules_changing set.
+    def add_rule(self, name, ptype, start, freq="weekly", interval=1, count=None, until=None,
+                 exceptions=(), length=1):
+        rule = RecurrenceRule(name, ptype, start, freq, interval, count, until, exceptions, length)
+        self._rule_changing(rule)
+        self.rules.add(rule)
+        self._save_rule(rule)
+        return rule
+
+    def update_rule(self, rid, **fields):
+        """Replace some fields of a rule, e.g. exceptions to skip an occurrence."""
+        old = self.rules.get(rid)
+        if old is None:
+            raise KeyError(rid)
+        spec = old.spec()
+        spec.update(fields)
+        rule = RecurrenceRule(**spec)
+        self._rule_changing(old, rule)
+        self.rules.add(rule)
+        self._save_rule(rule)
+        return rule
+
+    def remove_rule(self, rid):
+        rule = self.rules.get(rid)
+        if rule is not None:
+            self._rule_changing(rule)
+            self.rules.remove(rid)
+            self._drop_rule(rid)
+        return rule
+
+    def restore_rules(self, remove_rids, specs):
+        """Remove rules, then put RecurrenceRule.spec() dicts back under their own rids (undo / redo)."""
+        for rid in remove_rids:
+            self.remove_rule(rid)
+        for spec in specs:
+            rule = RecurrenceRule(**spec)
+            old = self.rules.get(rule.rid)
+            self._rule_changing(*([old] if old is not None else []), rule)
+            self.rules.add(rule)
+            self._save_rule(rule)
+
+    def _rule_changing(self, *rules):
+        self.rules_changing = True
+        try:
+            for r in rules:
+                self._notify(r.start, r.last_day())
+        finally:
+            self.rules_changing = False
+
+    def _save_rule(self, rule):
+        """Persistence hook for stores backed by a database."""
+
+    def _drop_rule(self, rid):
+        """Persistence hook for stores backed by a database."""
+
+    def ensure_loaded(self, lo, hi):
+        """Hook for stores that keep only a window in memory; everything is loaded here."""
+
+    def export_records(self, lo, hi, recurring=False):
+        """Plain (pid, name, ptype, start, end, done) tuples overlapping [lo, hi], safe to hand to a thread."""
+        return [(p.pid, p.name, p.ptype, p.start, p.end, p.done) for p in self.query(lo, hi, recurring)]
+
+    def all_records(self):
+        """export_records() tuples of every project, loaded or not."""
+        return [(p.pid, p.name, p.ptype, p.start, p.end, p.done) for p in self._projects.values()]
+
+    def clear(self):
+        b = self.bounds()
+        if b is not None:
+            self._notify(*b)
+        self._projects.clear()
+        self._reset_index()
+
+    def query(self, lo, hi=None, recurring=False):
+        """Projects overlapping the inclusive day range [lo, hi], in creation order.
+        With recurring, rule occurrences follow (expanded for this range only)."""
+        lo = to_jd(lo)
+        hi = lo if hi is None else to_jd(hi)
+        if self._pending:
+            self._flush()
+        out = []
+        for level in self._levels:
+            level.query(lo, hi, self._live, out)
+        out.sort(key=lambda p: p.pid)
+        if recurring and self.rules:
+            out.extend(self.rules.expand(lo, hi))
+        return out
+
+    def on_day(self, day):
+        return self.query(day, day)
+
+    def day_types(self, day):
+        return [p.ptype for p in self.query(day, day)]
+
+    def day_tids(self, day):
+        """Interned type ids on day, in creation order (no strings allocated)."""
+        return tuple([p.tid for p in self.query(day, day)])
+
+    def compact_day_map(self, lo, hi):
+        """CompactDayMap of the days in [lo, hi] that have projects."""
+        lo = to_jd(lo); hi = to_jd(hi)
+        return CompactDayMap((jd, [p.tid for p in active])
+                             for jd, active in sweep_days(self.query(lo, hi), lo, hi) if active)
+
+    def day_map(self, lo, hi):
+        """Expand [lo, hi] into {julian_day: [project types]} for days with projects."""
+        lo = to_jd(lo); hi = to_jd(hi)
+        out = {}
+        for p in self.query(lo, hi):
+            for jd in range(max(p.start, lo), min(p.end, hi) + 1):
+                out.setdefault(jd, []).append(p.ptype)
+        return out
+
+    def load_day_map(self, project_map):
+        """Replace contents from a legacy {'YYYY-MM-DD': [types]} map (or a CompactDayMap).
+
+        Consecutive days carrying the same type are coalesced into a single
+        project record, so an expanded six-month job becomes one record again.
+        """
+        self.clear()
+        if isinstance(project_map, CompactDayMap):
+            days = [(jd, [TYPE_NAMES[t] for t in tids]) for jd, tids in project_map.items()]
+        else:
+            days = sorted((to_jd(k), v) for k, v in (project_map or {}).items() if v)
+        if days:
+            self._notify(days[0][0], days[-1][0])
+        open_runs = {}
+        prev = None
+        for jd, types in days:
+            if prev is None or jd != prev + 1:
+                open_runs = {}
+            runs = {}
+            seen = {}
+            for ptype in types:
+                k = seen.get(ptype, 0)
+                seen[ptype] = k + 1
+                p = open_runs.get((ptype, k))
+                if p is None:
+                    p = self._insert(ptype, ptype, jd, jd)
+                else:
+                    p.end = jd  # still pending, indexed with its final range
+                runs[(ptype, k)] = p
+            open_runs = runs
+            prev = jd
+
+    def _flush(self):
+        """Index pending records as a new level and merge levels of similar size."""
+        if self._garbage > len(self._live):
+            # mostly stale: rebuild everything as one level
+            self._pending.update(self._projects)
+            self._levels = []
+            self._live = {}
+            self._garbage = 0
+        if not self._pending:
+            return
+        live = self._live
+        tok = self._next_token
+        entries = []
+        for p in self._pending.values():
+            live[p.pid] = tok
+            entries.append((p.start, tok, p.end, p))
+            tok += 1
+        self._next_token = tok
+        self._pending = {}
+        entries.sort()  # tokens are unique, so projects are never compared
+        levels = self._levels
+        while levels and len(levels[-1]) <= 2 * len(entries):
+            # both runs are sorted, so this sort is a linear merge
+            lv = levels.pop()
+            if self._garbage:
+                kept = [e for e in lv.entries() if live.get(e[3].pid) == e[1]]
+                self._garbage -= len(lv) - len(kept)
+            else:
+                kept = list(lv.entries())
+            entries = kept + entries
+            entries.sort()
+        levels.append(_IntervalLevel(entries))
+
+
+class ProjectMapView:
+    """Read-only 'YYYY-MM-DD' -> [types] view over a ProjectStore (legacy project_map)."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def get(self, key, default=None):
+        types = self._store.day_types(key)
+        return types if types else default
+
+    def __getitem__(self, key):
+        types = self._store.day_types(key)
+        if not types:
+            raise KeyError(key)
+        return types
+
+    def __contains__(self, key):
+        return bool(self._store.on_day(key))
+
+    def items(self):
+        b = self._store.bounds()
+        if b is None:
+            return
+        for jd, tids in self._store.compact_day_map(*b).items():
+            yield jd_to_iso(jd), [TYPE_NAMES[t] for t in tids]
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        return sum(1 for _ in self.items())
+
+# -----------------------
+# Recurring projects: rules expanded lazily, one month at a time
+# -----------------------
+RECUR_FREQS = ("daily", "weekly", "monthly")
+# last day reported to listeners for rules without count or until
+RECUR_OPEN_END = _date(9998, 12, 31).toordinal() + _JD_ORDINAL_OFFSET
+
+def _month_index(jd):
+    d = _date.fromordinal(jd - _JD_ORDINAL_OFFSET)
+    return d.year * 12 + d.month - 1
+
+def _month_first(idx):
+    return _date(idx // 12, idx % 12 + 1, 1).toordinal() + _JD_ORDINAL_OFFSET
+
+
+class RecurrenceRule:
+    """A project repeating every `interval` days, weeks or months from start.
+
+    Each occurrence lasts `length` days. The series stops after `count`
+    occurrences or at `until` (the last possible start day), whichever comes
+    first. `exceptions` are skipped start days; as EXDATE in iCalendar they
+    still count towards count. `completed` holds the start days of occurrences
+    marked done. Monthly rules keep the start's day of the month, clamped to
+    the last day of shorter months. Rules are not edited in place; an edit
+    replaces the rule under the same rid.
+    """
+    __slots__ = ("rid", "name", "ptype", "start", "freq", "interval", "count", "until",
+                 "exceptions", "length", "completed")
+
+    def __init__(self, name, ptype, start, freq="weekly", interval=1, count=None, until=None,
+                 exceptions=(), length=1, completed=(), rid=None):
+        if freq not in RECUR_FREQS:
+            raise ValueError(f"unknown frequency: {freq!r}")
+        if interval < 1 or length < 1 or (count is not None and count < 1):
+            raise ValueError("interval, length and count must be positive")
+        self.rid = rid
+        self.name = name
+        self.ptype = ptype
+        self.start = to_jd(start)
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = None if until is None else to_jd(until)
+        self.exceptions = frozenset(to_jd(d) for d in exceptions)
+        self.length = length
+        self.completed = frozenset(to_jd(d) for d in completed)
+
+    def spec(self):
+        """Constructor arguments, for copies with some fields changed."""
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def _nth(self, k):
+        """Start day of occurrence k (0-based), ignoring count and until."""
+        if self.freq != "monthly":
+            return self.start + k * self.interval * (7 if self.freq == "weekly" else 1)
+        d = _date.fromordinal(self.start - _JD_ORDINAL_OFFSET)
+        idx = d.year * 12 + d.month - 1 + k * self.interval
+        if idx >= 9999 * 12:
+            return RECUR_OPEN_END + 1
+        return min(_month_first(idx) + d.day - 1, _month_first(idx + 1) - 1)
+
+    def last_day(self):
+        """Last day covered by the series (RECUR_OPEN_END + length - 1 when open-ended)."""
+        last = RECUR_OPEN_END
+        if self.count is not None:
+            last = min(last, self._nth(self.count - 1))
+        if self.until is not None:
+            last = min(last, self.until)
+        return last + self.length - 1
+
+    def starts(self, lo, hi):
+        """Start days in [lo, hi], exceptions included. Cost follows the number
+        of occurrences in the range, not the rule's age."""
+        a = max(lo, self.start)
+        b = min(hi, RECUR_OPEN_END if self.until is None else self.until)
+        if a > b:
+            return []
+        if self.freq == "monthly":
+            k = max(0, -(-(_month_index(a) - _month_index(self.start)) // self.interval))
+        else:
+            step = self.interval * (7 if self.freq == "weekly" else 1)
+            k = -(-(a - self.start) // step)
+        out = []
+        while self.count is None or k < self.count:
+            s = self._nth(k)
+            if s > b:
+                break
+            if s >= a:
+                out.append(s)
+            k += 1
+        return out
+
+    def occurrences(self, lo, hi):
+        """Occurrences starting in [lo, hi] as Projects; their pid is -rid."""
+        pid = -self.rid
+        return [Project(pid, self.name, self.ptype, s, s + self.length - 1, s in self.completed)
+                for s in self.starts(lo, hi) if s not in self.exceptions]
+
+
+class RecurrenceSet:
+    """The recurring rules of a store, expanded lazily one month at a time.
+
+    The occurrences starting in a month are built the first time a query
+    touches it and kept in an LRU of MAX_MONTHS months, so memory follows what
+    is being looked at (the visible page and its prefetch), not how far ahead
+    the rules run. Any rule change drops the memo.
+    """
+    MAX_MONTHS = 36
+
+    def __init__(self):
+        self._rules = {}               # rid -> RecurrenceRule
+        self._next_rid = 1
+        self._max_length = 1           # longest occurrence, bounds how far back a query looks
+        self._months = OrderedDict()   # month index -> occurrences starting in it
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __iter__(self):
+        return iter(list(self._rules.values()))
+
+    def get(self, rid):
+        return self._rules.get(rid)
+
+    def add(self, rule):
+        """Add rule (or replace the rule with the same rid); assigns rid if unset."""
+        if rule.rid is None:
+            rule.rid = self._next_rid
+        self._next_rid = max(self._next_rid, rule.rid + 1)
+        self._rules[rule.rid] = rule
+        self._changed()
+        return rule
+
+    def remove(self, rid):
+        rule = self._rules.pop(rid, None)
+        self._changed()
+        return rule
+
+    def _changed(self):
+        self._months.clear()
+        self._max_length = max((r.length for r in self._rules.values()), default=1)
+
+    def memo_size(self):
+        return len(self._months)
+
+    def month(self, idx):
+        occ = self._months.get(idx)
+        if occ is not None:
+            self._months.move_to_end(idx)
+            return occ
+        lo, hi = _month_first(idx), _month_first(idx + 1) - 1
+        occ = self._months[idx] = tuple(p for r in self._rules.values() for p in r.occurrences(lo, hi))
+        if len(self._months) > self.MAX_MONTHS:
+            self._months.popitem(last=False)
+        return occ
+
+    def _month_range(self, lo, hi):
+        hi = min(hi, RECUR_OPEN_END)
+        return range(_month_index(lo - self._max_length + 1), _month_index(hi) + 1)
+
+    def prefetch(self, lo, hi):
+        """Expand the months of [lo, hi] ahead of the queries that will need them."""
+        if self._rules:
+            for idx in self._month_range(lo, hi)[-self.MAX_MONTHS // 2:]:
+                self.month(idx)
+
+    def expand(self, lo, hi):
+        """Occurrences overlapping [lo, hi], by rule (creation order) then start day."""
+        if not self._rules:
+            return []
+        out = []
+        for idx in self._month_range(lo, hi):
+            out.extend(p for p in self.month(idx) if p.end >= lo and p.start <= hi)
+        out.sort(key=lambda p: (-p.pid, p.start))
+        return out
+
+# -----------------------
+# On-disk project database (sqlite3, WAL) and a store that loads it by window
+# -----------------------
+class ProjectDatabase:
+    """Persistent project records. Overlap queries use the start_day index,
+    bounded below by the longest span ever stored (kept in the meta table)."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS projects (
+        id        INTEGER PRIMARY KEY,
+        name      TEXT NOT NULL,
+        ptype     TEXT NOT NULL,
+        start_day INTEGER NOT NULL,
+        end_day   INTEGER NOT NULL,
+        done      INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_projects_start ON projects(start_day);
+    CREATE INDEX IF NOT EXISTS idx_projects_end ON projects(end_day);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+    CREATE TABLE IF NOT EXISTS recurrences (
+        id         INTEGER PRIMARY KEY,
+        name       TEXT NOT NULL,
+        ptype      TEXT NOT NULL,
+        start_day  INTEGER NOT NULL,
+        freq       TEXT NOT NULL,
+        interval   INTEGER NOT NULL,
+        count      INTEGER,
+        until_day  INTEGER,
+        exceptions TEXT NOT NULL DEFAULT '',
+        length     INTEGER NOT NULL,
+        completed  TEXT NOT NULL DEFAULT ''
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        if "done" not in [c[1] for c in self.conn.execute("PRAGMA table_info(projects)")]:
+            # databases created before the completion flag existed
+            self.conn.execute("ALTER TABLE projects ADD COLUMN done INTEGER NOT NULL DEFAULT 0")
+        row = self.conn.execute("SELECT value FROM meta WHERE key='max_span'").fetchone()
+        if row is None:
+            row = self.conn.execute("SELECT MAX(end_day - start_day) FROM projects").fetchone()
+        self._max_span = row[0] or 0
+
+    @staticmethod
+    def default_path():
+        from PyQt6.QtCore import QStandardPaths
+        base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        os.makedirs(base, exist_ok=True)
+        return os.path.join(base, "projects.sqlite3")
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def bounds(self):
+        row = self.conn.execute("SELECT MIN(start_day), MAX(end_day) FROM projects").fetchone()
+        return None if row[0] is None else row
+
+    def _grow_span(self, start, end):
+        # only ever grows: a stale upper bound widens the scan but stays correct
+        if end - start > self._max_span:
+            self._max_span = end - start
+            self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES('max_span', ?)", (self._max_span,))
+
+    def add(self, name, ptype, start, end):
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO projects(name, ptype, start_day, end_day) VALUES(?, ?, ?, ?)",
+                (name, ptype, start, end))
+            self._grow_span(start, end)
+        return cur.lastrowid
+
+    def add_many(self, rows):
+        """rows: iterable of (name, ptype, start, end); one transaction."""
+        with self.conn:
+            for name, ptype, start, end in rows:
+                self.conn.execute(
+                    "INSERT INTO projects(name, ptype, start_day, end_day) VALUES(?, ?, ?, ?)",
+                    (name, ptype, start, end))
+                self._grow_span(start, end)
+
+    def remove(self, pid):
+        with self.conn:
+            self.conn.execute("DELETE FROM projects WHERE id=?", (pid,))
+
+    def apply_delta(self, remove_pids, rows):
+        """Delete ids and insert (name, ptype, start, end) rows in one transaction; returns the new ids."""
+        ids = []
+        with self.conn:
+            self.conn.executemany("DELETE FROM projects WHERE id=?", [(pid,) for pid in remove_pids])
+            for name, ptype, start, end in rows:
+                ids.append(self.conn.execute(
+                    "INSERT INTO projects(name, ptype, start_day, end_day) VALUES(?, ?, ?, ?)",
+                    (name, ptype, start, end)).lastrowid)
+                self._grow_span(start, end)
+        return ids
+
+    def restore(self, remove_pids, records):
+        """Delete ids and write (id, name, ptype, start, end, done) rows back under their ids."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM projects WHERE id=?", [(pid,) for pid in remove_pids])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO projects(id, name, ptype, start_day, end_day, done) VALUES(?, ?, ?, ?, ?, ?)",
+                [(pid, name, ptype, start, end, int(done)) for pid, name, ptype, start, end, done in records])
+            for r in records:
+                self._grow_span(r[3], r[4])
+
+    def update(self, pid, name, ptype, start, end, done=False):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE projects SET name=?, ptype=?, start_day=?, end_day=?, done=? WHERE id=?",
+                (name, ptype, start, end, int(done), pid))
+            self._grow_span(start, end)
+
+    def get(self, pid):
+        return self.conn.execute(
+            "SELECT id, name, ptype, start_day, end_day, done FROM projects WHERE id=?", (pid,)).fetchone()
+
+    def query(self, lo, hi):
+        """(id, name, ptype, start, end, done) rows overlapping [lo, hi], by id."""
+        return self.conn.execute(
+            "SELECT id, name, ptype, start_day, end_day, done FROM projects "
+            "WHERE start_day BETWEEN ? AND ? AND end_day >= ? ORDER BY id",
+            (lo - self._max_span, hi, lo)).fetchall()
+
+    def mark_done(self, lo, hi, done=True):
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE projects SET done=? WHERE start_day BETWEEN ? AND ? AND end_day >= ? AND done != ?",
+                (int(done), lo - self._max_span, hi, lo, int(done)))
+        return cur.rowcount
+
+    def remove_range(self, lo, hi, ptype=None):
+        rows = [r for r in self.query(lo, hi) if ptype is None or r[2] == ptype]
+        with self.conn:
+            for pid, name, pt, start, end, done in rows:
+                pieces = cut_range(start, end, lo, hi)
+                if not pieces:
+                    self.conn.execute("DELETE FROM projects WHERE id=?", (pid,))
+                    continue
+                self.conn.execute("UPDATE projects SET start_day=?, end_day=? WHERE id=?", (*pieces[0], pid))
+                if len(pieces) == 2:
+                    self.conn.execute(
+                        "INSERT INTO projects(name, ptype, start_day, end_day, done) VALUES(?, ?, ?, ?, ?)",
+                        (name, pt, *pieces[1], done))
+        return len(rows)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM projects")
+            self.conn.execute("DELETE FROM meta WHERE key='max_span'")
+        self._max_span = 0
+
+    # recurring rules; a handful of rows, read once when the store is opened
+    def rules(self):
+        rows = self.conn.execute(
+            "SELECT name, ptype, start_day, freq, interval, count, until_day, exceptions, length, completed, id "
+            "FROM recurrences ORDER BY id").fetchall()
+        return [RecurrenceRule(*r[:7], [int(d) for d in r[7].split()], r[8], [int(d) for d in r[9].split()], r[10])
+                for r in rows]
+
+    def save_rule(self, rule):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO recurrences(id, name, ptype, start_day, freq, interval, count, "
+                "until_day, exceptions, length, completed) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (rule.rid, rule.name, rule.ptype, rule.start, rule.freq, rule.interval, rule.count, rule.until,
+                 " ".join(map(str, sorted(rule.exceptions))), rule.length,
+                 " ".join(map(str, sorted(rule.completed)))))
+
+    def delete_rule(self, rid):
+        with self.conn:
+            self.conn.execute("DELETE FROM recurrences WHERE id=?", (rid,))
+
+
+class DatabaseProjectStore(ProjectStore):
+    """ProjectStore that keeps only a window of a ProjectDatabase in memory.
+
+    ensure_loaded() (called when the visible page changes) reloads the window
+    around the page plus prefetch_days on each side, so startup time and
+    resident memory do not depend on the database size. Writes go through to
+    the database; pids are database row ids. As with the base store, listeners
+    are notified before the database is written.
+    """
+
+    def __init__(self, db, prefetch_days=31):
+        super().__init__()
+        self.db = db
+        self.prefetch_days = prefetch_days
+        self.window = None  # (lo, hi) Julian days held in memory
+        for rule in db.rules():
+            self.rules.add(rule)
+
+    def ensure_loaded(self, lo, hi):
+        if self.window is None or lo < self.window[0] or hi > self.window[1]:
+            self.load_window(lo - self.prefetch_days, hi + self.prefetch_days)
+
+    def load_window(self, lo, hi):
+        rows = self.db.query(lo, hi)
+        self.reloading = True
+        try:
+            if self.window is not None:
+                self._notify(min(lo, self.window[0]), max(hi, self.window[1]))
+            else:
+                self._notify(lo, hi)
+        finally:
+            self.reloading = False
+        self._projects.clear()
+        self._reset_index()
+        for pid, name, ptype, start, end, done in rows:
+            self._insert(name, ptype, start, end, pid, bool(done))
+        self.window = (lo, hi)
+
+    def _reload(self):
+        if self.window is not None:
+            self.load_window(*self.window)
+
+    def _in_window(self, start, end):
+        return self.window is not None and end >= self.window[0] and start <= self.window[1]
+
+    def export_records(self, lo, hi, recurring=False):
+        # ranges beyond the loaded window come straight from the database
+        lo = to_jd(lo); hi = to_jd(hi)
+        rows = self.db.query(lo, hi)
+        if recurring and self.rules:
+            rows += [(p.pid, p.name, p.ptype, p.start, p.end, p.done) for p in self.rules.expand(lo, hi)]
+        return rows
+
+    def all_records(self):
+        b = self.db.bounds()
+        return [] if b is None else self.db.query(*b)
+
+    def _save_rule(self, rule):
+        self.db.save_rule(rule)
+
+    def _drop_rule(self, rid):
+        self.db.delete_rule(rid)
+
+    def add(self, name, ptype, start, end=None):
+        start = to_jd(start)
+        end = start if end is None else to_jd(end)
+        if end < start:
+            start, end = end, start
+        self._notify(start, end)
+        pid = self.db.add(name, ptype, start, end)
+        return self._insert(name, ptype, start, end, pid)
+
+    def add_many(self, rows):
+        rows = [_norm_row(r) for r in rows]
+        if not rows:
+            return 0
+        self._notify(min(r[2] for r in rows), max(r[3] for r in rows))
+        self.db.add_many(rows)
+        self._reload()
+        return len(rows)
+
+    def remove(self, pid):
+        p = self._projects.get(pid)
+        if p is None:
+            row = self.db.get(pid)  # outside the loaded window
+            if row is None:
+                return None
+            p = Project(*row)
+        self._notify(p.start, p.end)
+        self.db.remove(pid)
+        if self._projects.pop(pid, None) is not None:
+            self._forget(pid)
+        return p
+
+    def _spans(self, pids):
+        spans = []
+        for pid in pids:
+            p = self._projects.get(pid)
+            if p is not None:
+                spans.append((p.start, p.end))
+            else:
+                row = self.db.get(pid)  # outside the loaded window
+                if row is not None:
+                    spans.append((row[3], row[4]))
+        return spans
+
+    def apply_delta(self, remove_pids=(), add_rows=()):
+        rows = [_norm_row(r) for r in add_rows]
+        remove_pids = list(remove_pids)
+        for a, b in self._spans(remove_pids):
+            self._notify(a, b)
+        for r in rows:
+            self._notify(r[2], r[3])
+        pids = self.db.apply_delta(remove_pids, rows)
+        for pid in remove_pids:
+            if self._projects.pop(pid, None) is not None:
+                self._forget(pid)
+        for pid, r in zip(pids, rows):
+            if self._in_window(r[2], r[3]):
+                self._insert(*r, pid)
+        return pids
+
+    def restore(self, remove_pids, records):
+        remove_pids = list(remove_pids)
+        for a, b in self._spans(remove_pids):
+            self._notify(a, b)
+        for r in records:
+            self._notify(r[3], r[4])
+        self.db.restore(remove_pids, records)
+        for pid in remove_pids:
+            if self._projects.pop(pid, None) is not None:
+                self._forget(pid)
+        for pid, name, ptype, start, end, done in records:
+            if self._in_window(start, end):
+                self._insert(name, ptype, start, end, pid, bool(done))
+
+    def update(self, pid, **fields):
+        row = self.db.get(pid)
+        if row is None:
+            raise KeyError(pid)
+        rec = dict(zip(("pid", "name", "ptype", "start", "end", "done"), row))
+        rec.update({k: (to_jd(v) if k in ("start", "end") else v) for k, v in fields.items()})
+        if rec["end"] < rec["start"]:
+            rec["start"], rec["end"] = rec["end"], rec["start"]
+        self._notify(min(row[3], rec["start"]), max(row[4], rec["end"]))
+        self.db.update(pid, rec["name"], rec["ptype"], rec["start"], rec["end"], rec["done"])
+        self._reload()
+        return self.get(pid)
+
+    def remove_range(self, lo, hi=None, ptype=None):
+        lo = to_jd(lo)
+        hi = lo if hi is None else to_jd(hi)
+        if hi < lo:
+            lo, hi = hi, lo
+        hits = [r for r in self.db.query(lo, hi) if ptype is None or r[2] == ptype]
+        if not hits:
+            return 0
+        self._notify(min(r[3] for r in hits), max(r[4] for r in hits))
+        n = self.db.remove_range(lo, hi, ptype)
+        self._reload()
+        return n
+
+    def mark_done(self, lo, hi=None, done=True):
+        lo = to_jd(lo)
+        hi = lo if hi is None else to_jd(hi)
+        if hi < lo:
+            lo, hi = hi, lo
+        n = self._mark_rules_done(lo, hi, done)
+        hits = [r for r in self.db.query(lo, hi) if bool(r[5]) != done]
+        if not hits:
+            return n
+        self._notify(min(r[3] for r in hits), max(r[4] for r in hits))
+        self.db.mark_done(lo, hi, done)
+        self._reload()
+        return n + len(hits)
+
+    def clear(self):
+        b = self.db.bounds()
+        if b is not None:
+            self._notify(*b)
+        self.db.clear()
+        self._projects.clear()
+        self._reset_index()
+
+    def load_day_map(self, project_map):
+        tmp = ProjectStore()
+        tmp.load_day_map(project_map)
+        for b in (self.db.bounds(), tmp.bounds()):
+            if b is not None:
+                self._notify(*b)
+        self.db.clear()
+        self.db.add_many((p.name, p.ptype, p.start, p.end) for p in sorted(tmp, key=lambda p: p.pid))
+        self._reload()
+
+# -----------------------
+# Journal persistence: append-only change log plus periodic snapshots
+# -----------------------
+class ProjectJournal:
+    """Projects and recurring rules kept in a directory as a snapshot plus journals.
+
+    Each change is appended to journal.<gen>.jsonl as one JSON line:
+    ["put", pid, name, ptype, start, end, done], ["del", pid], ["rule", spec]
+    or ["unrule", rid]. Replaying the lines in order rebuilds the state, and
+    every line is idempotent, so replaying one twice is harmless.
+    snapshot.jsonl is a {"gen": g} header followed by put / rule lines for the
+    whole state at the moment journal g was started; load() reads it through
+    mmap and replays only the journals from g on.
+
+    Compaction starts journal g + 1, writes the snapshot for it to a temporary
+    file (fsync, then atomic rename) and only then deletes the older journals,
+    so a crash at any point leaves a snapshot and every journal after it. A
+    line cut short by a crash ends the replay and is truncated away before
+    appending resumes.
+    """
+    SNAPSHOT = "snapshot.jsonl"
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.gen = 0        # journal being appended to
+        self.ops = 0        # journal lines since the snapshot
+        self._buf = []      # encoded lines not written yet
+        self._file = None
+
+    @staticmethod
+    def default_path():
+        from PyQt6.QtCore import QStandardPaths
+        base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        return os.path.join(base, "projects.journal")
+
+    @staticmethod
+    def rule_entry(rule):
+        """JSON-friendly RecurrenceRule spec (RecurrenceRule(**entry) reads it back)."""
+        spec = rule.spec()
+        spec["exceptions"] = sorted(rule.exceptions)
+        spec["completed"] = sorted(rule.completed)
+        return spec
+
+    def _journal_path(self, gen):
+        return os.path.join(self.path, f"journal.{gen}.jsonl")
+
+    def _journals(self):
+        """Generations of the journal files present, ascending."""
+        gens = []
+        for name in os.listdir(self.path):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] == "journal" and parts[1].isdigit() and parts[2] == "jsonl":
+                gens.append(int(parts[1]))
+        return sorted(gens)
+
+    @staticmethod
+    def _replay(path, records, rules):
+        """Apply the lines of one file to records / rules.
+        Returns (header or None, lines applied, offset after the last whole line)."""
+        import mmap
+        header, n, good = None, 0, 0
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return header, n, good  # mmap refuses empty files
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        op = json.loads(line)
+                    except ValueError:
+                        break  # cut short by a crash
+                    if isinstance(op, dict):
+                        header = op
+                    elif op[0] == "put":
+                        records[op[1]] = (op[1], op[2], op[3], op[4], op[5], bool(op[6]))
+                    elif op[0] == "del":
+                        records.pop(op[1], None)
+                    elif op[0] == "rule":
+                        rules[op[1]["rid"]] = op[1]
+                    elif op[0] == "unrule":
+                        rules.pop(op[1], None)
+                    n += 1
+                    good = mm.tell()
+        return header, n, good
+
+    def load(self):
+        """Replay the snapshot and the journals after it, and open the newest
+        journal for appending. Returns ({pid: record tuple}, {rid: rule spec})."""
+        records, rules = {}, {}
+        first = 0
+        snap = os.path.join(self.path, self.SNAPSHOT)
+        if os.path.exists(snap):
+            header, _, _ = self._replay(snap, records, rules)
+            first = (header or {}).get("gen", 0)
+        end = 0
+        self.ops = 0
+        gens = []
+        for g in self._journals():
+            if g < first:
+                os.remove(self._journal_path(g))  # compaction finished before the crash
+                continue
+            gens.append(g)
+            _, n, end = self._replay(self._journal_path(g), records, rules)
+            self.ops += n
+        self.gen = gens[-1] if gens else first
+        self._file = open(self._journal_path(self.gen), "ab")
+        if gens:
+            self._file.truncate(end)  # drop a torn last line
+        return records, rules
+
+    def append(self, op):
+        """Buffer one journal line; it is written and fsynced by the next sync()."""
+        self._buf.append(json.dumps(op, separators=(",", ":")) + "\n")
+        self.ops += 1
+
+    def sync(self):
+        """Write the buffered lines and fsync them: one fsync per batch."""
+        if self._buf and self._file is not None:
+            self._file.write("".join(self._buf).encode())
+            self._buf.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def rotate(self):
+        """Sync, then start journal gen + 1; returns its generation, the one the
+        snapshot of the current state belongs to."""
+        self.sync()
+        self._file.close()
+        self.gen += 1
+        self._file = open(self._journal_path(self.gen), "ab")
+        self.ops = 0
+        return self.gen
+
+    def write_snapshot(self, gen, records, rules):
+        """Write the snapshot for journal gen from export_records() tuples and
+        rule_entry() specs, then delete the journals it covers. Only touches
+        files other than the open journal, so it can run on a worker thread."""
+        tmp = os.path.join(self.path, self.SNAPSHOT + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"gen": gen}) + "\n")
+            for r in records:
+                f.write(json.dumps(["put", *r], separators=(",", ":")) + "\n")
+            for spec in rules:
+                f.write(json.dumps(["rule", spec], separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, self.SNAPSHOT))
+        if hasattr(os, "O_DIRECTORY"):  # make the rename itself durable (POSIX)
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for g in self._journals():
+            if g < gen:
+                os.remove(self._journal_path(g))
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+class SnapshotThread(QThread):
+    """Runs ProjectJournal.write_snapshot() off the UI thread."""
+    failed = pyqtSignal(str)
+
+    def __init__(self, journal, gen, records, rules, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.gen = gen
+        self.records = records
+        self.rules = rules
+
+    def run(self):
+        try:
+            self.journal.write_snapshot(self.gen, self.records, self.rules)
+        except OSError as ex:
+            self.failed.emit(str(ex))
+
+
+class JournalProjectStore(ProjectStore):
+    """ProjectStore persisted to a ProjectJournal.
+
+    Everything is held in memory, as in the base store. At the end of each
+    event-loop tick a ChangeTracker diff of the notified ranges is journalled,
+    so a save costs O(changed records), not O(all projects). Lines are fsynced
+    in batches at most SYNC_MS apart; once the journals hold COMPACT_OPS lines
+    a snapshot is written on a worker thread, which bounds what the next start
+    has to replay.
+    """
+    SYNC_MS = 250
+    COMPACT_OPS = 20000
+
+    def __init__(self, journal):
+        super().__init__()
+        self.journal = journal
+        records, rules = journal.load()
+        for pid, name, ptype, start, end, done in sorted(records.values()):
+            self._insert(name, ptype, start, end, pid, done)
+        for spec in rules.values():
+            self.rules.add(RecurrenceRule(**spec))
+        self._changes = ChangeTracker(self)
+        self._scheduled = False
+        self._sync_scheduled = False
+        self._compactor = None
+        if journal.ops >= self.COMPACT_OPS:
+            QTimer.singleShot(0, self.compact)
+
+    def _notify(self, lo, hi):
+        if not self.reloading and not self.rules_changing:
+            self._changes.touch(lo, hi)
+            if not self._scheduled:
+                self._scheduled = True
+                QTimer.singleShot(0, self.commit)
+        super()._notify(lo, hi)
+
+    def commit(self):
+        """Journal the records changed since the last commit (normally at the end of the tick)."""
+        self._scheduled = False
+        if not self._changes.ranges:
+            return
+        removed, added = self._changes.diff()
+        kept = {r[0] for r in added}
+        for r in removed:
+            if r[0] not in kept:
+                self.journal.append(["del", r[0]])
+        for r in added:
+            self.journal.append(["put", *r])
+        if removed or added:
+            self._schedule_sync()
+
+    def _save_rule(self, rule):
+        self.journal.append(["rule", ProjectJournal.rule_entry(rule)])
+        self._schedule_sync()
+
+    def _drop_rule(self, rid):
+        self.journal.append(["unrule", rid])
+        self._schedule_sync()
+
+    def _schedule_sync(self):
+        if not self._sync_scheduled:
+            self._sync_scheduled = True
+            QTimer.singleShot(self.SYNC_MS, self.sync)
+
+    def sync(self):
+        self._sync_scheduled = False
+        self.journal.sync()
+        if self.journal.ops >= self.COMPACT_OPS:
+            self.compact()
+
+    def compact(self):
+        """Start a snapshot of the current state (no-op while one is being written)."""
+        if self._compactor is not None:
+            return
+        self.commit()
+        gen = self.journal.rotate()
+        rules = [ProjectJournal.rule_entry(r) for r in self.rules]
+        self._compactor = SnapshotThread(self.journal, gen, self.all_records(), rules)
+        self._compactor.failed.connect(lambda err: print(f"Snapshot failed: {err}", file=sys.stderr))
+        self._compactor.finished.connect(self._on_compacted)
+        self._compactor.start()
+
+    def _on_compacted(self):
+        job, self._compactor = self._compactor, None
+        if job is not None:
+            job.deleteLater()
+
+    def close(self):
+        """Journal and fsync what is pending and wait for a running snapshot."""
+        self.commit()
+        if self._compactor is not None:
+            self._compactor.wait()
+        self.journal.close()
+
+# -----------------------
+# Undo / redo: per-step deltas of immutable record tuples
+# -----------------------
+class ChangeTracker:
+    """The records a store changes between two diff() calls.
+
+    Store listeners report each day range before it changes; touch() captures
+    the records overlapping the parts of it not touched yet (before), and
+    diff() reads the touched ranges again (after). Only the records that
+    differ are returned, as immutable export_records() tuples, so both cost
+    O(changed days).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.reset()
+
+    def reset(self):
+        self.ranges = []    # merged day ranges touched since the last diff
+        self.before = {}    # pid -> record as it was before them
+
+    def touch(self, lo, hi):
+        # a record overlapping a range not touched yet is unchanged so far,
+        # so its current state is its before state
+        pos = lo
+        for a, b in self.ranges:
+            if b < pos:
+                continue
+            if a > hi:
+                break
+            if a > pos:
+                self._capture(pos, a - 1)
+            pos = max(pos, b + 1)
+        if pos <= hi:
+            self._capture(pos, hi)
+        merged = []
+        for a, b in sorted(self.ranges + [(lo, hi)]):
+            if merged and a <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self.ranges = merged
+
+    def _capture(self, lo, hi):
+        before = self.before
+        for r in self.store.export_records(lo, hi):
+            if r[0] not in before:
+                before[r[0]] = r
+
+    def diff(self):
+        """(removed, added): old versions of the records changed or deleted,
+        new versions of those changed or created. Starts a new round."""
+        after = {}
+        for a, b in self.ranges:
+            for r in self.store.export_records(a, b):
+                after[r[0]] = r
+        before = self.before
+        removed = [r for pid, r in before.items() if after.get(pid) != r]
+        added = [r for pid, r in after.items() if before.get(pid) != r]
+        self.reset()
+        return removed, added
+
+
+class UndoHistory:
+    """Undo / redo for a ProjectStore.
+
+    Each step is the ChangeTracker diff of the records it changed, so it costs
+    O(changed days) to take and to hold. Unchanged records are never copied;
+    every version shares them with the live store.
+
+    All changes made in one event-loop tick form one step. begin_group() /
+    end_group() merge longer bulk edits (e.g. an import arriving in batches).
+    Recurring rules (a handful per store) are kept in the step as the
+    RecurrenceRule.spec() of each changed rule before and after it.
+    """
+
+    def __init__(self, store, depth=100):
+        self.store = None
+        self._undo = deque(maxlen=depth)
+        self._redo = []
+        self._group = 0
+        self._scheduled = False
+        self._applying = False
+        self._changes = None
+        self._rules_before = None  # rid -> spec of every rule when the open step first changed one
+        self.set_store(store)
+
+    @property
+    def depth(self):
+        return self._undo.maxlen
+
+    def set_depth(self, depth):
+        self._undo = deque(self._undo, maxlen=depth)
+
+    def set_store(self, store):
+        if self.store is not None:
+            self.store.remove_listener(self._on_changing)
+        self.store = store
+        store.add_listener(self._on_changing)
+        self._changes = ChangeTracker(store)  # the open step
+        self.clear()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._changes.reset()
+        self._rules_before = None
+
+    def can_undo(self):
+        return bool(self._undo) or bool(self._changes.ranges) or self._rules_before is not None
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def begin_group(self):
+        self._group += 1
+
+    def end_group(self):
+        self._group = max(0, self._group - 1)
+        if not self._group:
+            self.commit()
+
+    def _on_changing(self, lo, hi):
+        if self._applying or self.store.reloading:
+            return
+        if self.store.rules_changing:
+            # the range spans the whole series; keep the rules' specs instead
+            if self._rules_before is None:
+                self._rules_before = {r.rid: r.spec() for r in self.store.rules}
+        else:
+            self._changes.touch(lo, hi)
+        if not self._group and not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self.commit)
+
+    def commit(self):
+        """Close the open step (normally called at the end of the tick)."""
+        self._scheduled = False
+        if self._group or (not self._changes.ranges and self._rules_before is None):
+            return
+        removed, added = self._changes.diff()
+        rules_removed, rules_added = self._rules_diff()
+        if removed or added or rules_removed or rules_added:
+            self._undo.append((removed, added, rules_removed, rules_added))
+            self._redo.clear()
+
+    def _rules_diff(self):
+        """(removed, added) specs of the rules changed since _rules_before, like ChangeTracker.diff()."""
+        before, self._rules_before = self._rules_before, None
+        if before is None:
+            return [], []
+        after = {r.rid: r.spec() for r in self.store.rules}
+        return ([spec for rid, spec in before.items() if after.get(rid) != spec],
+                [spec for rid, spec in after.items() if before.get(rid) != spec])
+
+    def _apply(self, drop, put, drop_rules, put_rules):
+        self._applying = True
+        try:
+            if drop or put:
+                self.store.restore([r[0] for r in drop], put)
+            if drop_rules or put_rules:
+                keep = {spec["rid"] for spec in put_rules}  # replaced in place, not removed
+                self.store.restore_rules([spec["rid"] for spec in drop_rules if spec["rid"] not in keep], put_rules)
+        finally:
+            self._applying = False
+
+    def undo(self):
+        self.commit()
+        if not self._undo:
+            return False
+        removed, added, rules_removed, rules_added = step = self._undo.pop()
+        self._apply(added, removed, rules_added, rules_removed)
+        self._redo.append(step)
+        return True
+
+    def redo(self):
+        self.commit()
+        if not self._redo:
+            return False
+        removed, added, rules_removed, rules_added = step = self._redo.pop()
+        self._apply(removed, added, rules_removed, rules_added)
+        self._undo.append(step)
+        return True
+
+# -----------------------
+# Search index: name / type words -> projects, with prefix lookup
+# -----------------------
+_WORD_RE = re.compile(r"\w+")
+
+def search_words(*texts):
+    return {w for t in texts for w in _WORD_RE.findall(t.lower())}
+
+
+class SearchMatch:
+    """Ids matched by a SearchIndex query (pids, and -rid for recurring rules),
+    with next / previous navigation over their start days."""
+
+    def __init__(self, ids, starts, rules):
+        self.ids = ids
+        self.starts = starts    # sorted start days of the matched records
+        self.rules = rules      # matched RecurrenceRules
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, pid):
+        return pid in self.ids
+
+    def next(self, day):
+        """First start day after day, or None."""
+        i = bisect_right(self.starts, day)
+        best = self.starts[i] if i < len(self.starts) else None
+        for rule in self.rules:
+            # widening windows: the cost follows the distance, not the series length
+            a, w = day + 1, 32
+            last = rule.last_day() if best is None else min(best - 1, rule.last_day())
+            while a <= last:
+                found = [s for s in rule.starts(a, min(a + w - 1, last)) if s not in rule.exceptions]
+                if found:
+                    best = found[0]
+                    break
+                a, w = a + w, w * 2
+        return best
+
+    def prev(self, day):
+        """Last start day before day, or None."""
+        i = bisect_left(self.starts, day)
+        best = self.starts[i - 1] if i else None
+        for rule in self.rules:
+            b, w = day - 1, 32
+            first = rule.start if best is None else max(best + 1, rule.start)
+            while b >= first:
+                found = [s for s in rule.starts(max(b - w + 1, first), b) if s not in rule.exceptions]
+                if found:
+                    best = found[-1]
+                    break
+                b, w = b - w, w * 2
+        return best
+
+
+class SearchIndex(QObject):
+    """Inverted index from the lower-cased words of project names and types
+    to project ids, for the search bar.
+
+    Words live in a character trie, so a query term matches every word it is
+    a prefix of. A term costs O(len(term) + matching words + their postings)
+    and a query intersects its terms, independent of the date span. The
+    index is built on first use and then follows the store. The records in a
+    changed range are noted when the listener fires and compared at the end
+    of the tick, so an edit costs O(records in the touched range) and only
+    the changed ones are re-indexed.
+    Recurring rules are indexed under -rid, like their occurrences.
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.set_store(store)
+
+    def set_store(self, store):
+        if self.store is not None:
+            self.store.remove_listener(self._on_changing)
+        self.store = store
+        store.add_listener(self._on_changing)
+        self._built = False
+        self._postings = {}   # word -> set of ids
+        self._trie = {}       # char -> node; node[""] = word ending there
+        self._entries = {}    # id -> (start, words, name, ptype); start is None for rules
+        self._before = set()  # ids of the records in ranges changing this tick
+        self._dirty = []
+        self._rules_dirty = False
+        self._scheduled = False
+
+    def ensure_built(self):
+        if self._built:
+            return
+        self._built = True
+        # bulk path of _add: words of the few types are split once, the trie is filled at the end
+        postings, entries = self._postings, self._entries
+        type_words = {}
+        for pid, name, ptype, start, _end, _done in self.store.all_records():
+            words = type_words.get(ptype)
+            if words is None:
+                words = type_words[ptype] = frozenset(search_words(ptype))
+            words = words.union(_WORD_RE.findall(name.lower()))
+            entries[pid] = (start, words, name, ptype)
+            for w in words:
+                ids = postings.get(w)
+                if ids is None:
+                    postings[w] = {pid}
+                else:
+                    ids.add(pid)
+        for w in postings:
+            self._trie_add(w)
+        self._index_rules()
+
+    def _add(self, key, name, ptype, start):
+        if key in self._entries:
+            self._drop(key)
+        words = search_words(name, ptype)
+        self._entries[key] = (start, words, name, ptype)
+        for w in words:
+            ids = self._postings.get(w)
+            if ids is None:
+                ids = self._postings[w] = set()
+                self._trie_add(w)
+            ids.add(key)
+
+    def _trie_add(self, word):
+        node = self._trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = word
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for w in entry[1]:
+            ids = self._postings[w]
+            ids.discard(key)
+            if not ids:
+                del self._postings[w]
+                self._trie_remove(w)
+
+    def _trie_remove(self, word):
+        path = [self._trie]
+        for ch in word:
+            path.append(path[-1][ch])
+        del path[-1][""]
+        # prune the nodes left empty, deepest first
+        for i in range(len(word), 0, -1):
+            if path[i]:
+                break
+            del path[i - 1][word[i - 1]]
+
+    def _index_rules(self):
+        for key in [k for k in self._entries if k < 0]:
+            self._drop(key)
+        for rule in self.store.rules:
+            self._add(-rule.rid, rule.name, rule.ptype, None)
+
+    def _on_changing(self, lo, hi):
+        if not self._built or self.store.reloading:
+            return
+        if self.store.rules_changing:
+            self._rules_dirty = True
+        else:
+            self._before.update(r[0] for r in self.store.export_records(lo, hi))
+            self._dirty.append((lo, hi))
+        if not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self._flush)
+
+    def _flush(self):
+        self._scheduled = False
+        merged = []
+        for a, b in sorted(self._dirty):
+            if merged and a <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self._dirty = []
+        before, self._before = self._before, set()
+        entries = self._entries
+        for a, b in merged:
+            for pid, name, ptype, start, _end, _done in self.store.export_records(a, b):
+                before.discard(pid)
+                e = entries.get(pid)
+                # only new records and those whose words or start changed are re-indexed
+                if e is None or e[0] != start or e[2] != name or e[3] != ptype:
+                    self._add(pid, name, ptype, start)
+        for pid in before:
+            self._drop(pid)  # removed (a moved record is still inside the notified ranges)
+        if self._rules_dirty:
+            self._rules_dirty = False
+            self._index_rules()
+        self.changed.emit()
+
+    def complete(self, prefix):
+        """Indexed words starting with prefix."""
+        node = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        out = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch:
+                    stack.append(child)
+                else:
+                    out.append(child)
+        return out
+
+    def find(self, text):
+        """SearchMatch of the projects whose name or type has a word starting
+        with each word of text, or None when text has no words."""
+        terms = sorted(search_words(text), key=len, reverse=True)  # longest: fewest words
+        if not terms:
+            return None
+        self.ensure_built()
+        ids = None
+        for term in terms:
+            hits = set()
+            for w in self.complete(term):
+                hits |= self._postings[w]
+            ids = hits if ids is None else ids & hits
+            if not ids:
+                break
+        entries = self._entries
+        starts = sorted(entries[i][0] for i in ids if i > 0)
+        rules = [r for r in (self.store.rules.get(-i) for i in ids if i < 0) if r is not None]
+        return SearchMatch(ids, starts, rules)
+
+# -----------------------
+# Status engine: derived statuses and the midnight rollover
+# -----------------------
+class StatusEngine(QObject):
+    """Owns "today" for derived project statuses (see project_status).
+
+    Status depends on the day only through end < today, so a rollover can only
+    change projects ending between the old and the new day; those are found
+    with one store query instead of a rescan. A single-shot timer fires just
+    after the next midnight. Listeners are called as fn(lo, hi) *before* the
+    switch, like ProjectStore listeners, for each changed project's range and
+    for the old and new today cells.
+    """
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.today = QDate.currentDate().toJulianDay()
+        self._listeners = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.refresh)
+        self._schedule()
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def status(self, p):
+        return project_status(p.ptype, p.end, self.today, p.done)
+
+    def _schedule(self):
+        now = QDateTime.currentDateTime()
+        midnight = QDateTime(now.date().addDays(1), QTime(0, 0))
+        self._timer.start(max(1000, now.msecsTo(midnight) + 500))
+
+    def refresh(self):
+        """Pick up a date change (midnight timer, or noticed late after a suspend)."""
+        today = QDate.currentDate().toJulianDay()
+        if today != self.today:
+            self.advance(today)
+        self._schedule()
+
+    def advance(self, today):
+        """Move to today; returns the projects whose status changed."""
+        old = self.today
+        if today == old:
+            return []
+        lo, hi = min(old, today), max(old, today) - 1
+        # export_records, not ensure_loaded + query: a windowed store would move
+        # its window off the page being shown
+        changed = [Project(*r) for r in self.store.export_records(lo, hi, recurring=True)
+                   if r[4] <= hi and project_status(r[2], r[4], old, r[5])
+                   != project_status(r[2], r[4], today, r[5])]
+        for fn in self._listeners:
+            fn(old, old)
+            fn(today, today)
+            for p in changed:
+                fn(p.start, p.end)
+        self.today = today
+        return changed
+
+# -----------------------
+# Streaming CSV export (worker thread)
+# -----------------------
+EXPORT_STOP_CHECK_DAYS = 256  # how often iter_export_rows asks stop()
+
+def iter_export_rows(records, lo, hi, only_with_projects=False, today=None, stop=None):
+    """Yield (date, project, status) rows for each day in [lo, hi].
+
+    records are (pid, name, ptype, start, end, done) tuples; see sweep_days.
+    Statuses are derived as of today (None: completion flag and type only).
+    stop() is called every EXPORT_STOP_CHECK_DAYS days and ends the rows early
+    when true, so cancelling does not wait for rows on a sparse range.
+    """
+    for jd, active in sweep_days(records, lo, hi, start=lambda r: r[3], end=lambda r: r[4], key=lambda r: r[0]):
+        if stop is not None and (jd - lo) % EXPORT_STOP_CHECK_DAYS == 0 and stop():
+            return
+        if active:
+            day = jd_to_iso(jd)
+            for r in active:
+                yield (day, r[1], project_status(r[2], r[4], today, r[5]))
+        elif not only_with_projects:
+            yield (jd_to_iso(jd), "", "")
+
+
+class CsvExportThread(QThread):
+    """Writes iter_export_rows() to a CSV file in batches; cancel with requestInterruption()."""
+    progress = pyqtSignal(int, int)   # days done, days total
+    done = pyqtSignal(int, str)       # rows written, path
+    failed = pyqtSignal(str)
+
+    BATCH = 5000
+
+    def __init__(self, path, records, lo, hi, only_with_projects=False, parent=None, today=None):
+        super().__init__(parent)
+        self.path = path
+        self.records = records
+        self.lo, self.hi = lo, hi
+        self.only_with_projects = only_with_projects
+        self.today = today
+
+    def run(self):
+        total = self.hi - self.lo + 1
+        written = 0
+        batch = []
+        stopped = False
+
+        def stop():
+            nonlocal stopped
+            stopped = self.isInterruptionRequested()
+            return stopped
+
+        try:
+            with open(self.path, "w", newline='', encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(("date", "project", "status"))
+                complete = False
+                rows = iter_export_rows(self.records, self.lo, self.hi, self.only_with_projects, self.today, stop)
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= self.BATCH:
+                        if self.isInterruptionRequested():
+                            break  # this batch is not written: the file is truncated
+                        writer.writerows(batch)
+                        written += len(batch)
+                        batch.clear()
+                        self.progress.emit(to_jd(row[0]) - self.lo + 1, total)
+                else:
+                    writer.writerows(batch)
+                    written += len(batch)
+                    complete = not stopped  # stop() may have ended the rows early
+            if not complete:
+                # interrupted before the last row; a late cancel keeps the finished file
+                os.remove(self.path)  # don't leave a truncated export behind
+                return
+            self.progress.emit(total, total)
+            self.done.emit(written, self.path)
+        except Exception as ex:
+            self.failed.emit(str(ex))
+
+# -----------------------
+# Clipboard encoding: compact range notation, generated line by line
+# -----------------------
+COPY_MODES = ("range", "busy", "projects")
+CLIPBOARD_CHUNK_CHARS = 1 << 20  # larger payloads are copied one part per Copy press
+
+def iso_interval(lo, hi):
+    """ISO 8601 date or interval ('2025-01-01/2025-03-31') for the days [lo, hi]."""
+    return jd_to_iso(lo) if lo == hi else f"{jd_to_iso(lo)}/{jd_to_iso(hi)}"
+
+def busy_runs(records, lo, hi):
+    """Merged [first, last] runs of days in [lo, hi] covered by any record.
+    records are export_records() tuples; cost depends on them, not on hi - lo."""
+    runs = []
+    for r in sorted(records, key=lambda r: r[3]):
+        a, b = max(r[3], lo), min(r[4], hi)
+        if a > b:
+            continue
+        if runs and a <= runs[-1][1] + 1:
+            if b > runs[-1][1]:
+                runs[-1][1] = b
+        else:
+            runs.append([a, b])
+    return runs
+
+def iter_copy_lines(records, lo, hi, mode="range", today=None):
+    """Lines to copy for [lo, hi]:
+    range    - the selection as one ISO 8601 interval
+    busy     - one interval per run of days that have projects
+    projects - interval, name, type and status per project, clipped to the selection
+    """
+    if mode == "range":
+        yield iso_interval(lo, hi)
+    elif mode == "busy":
+        for a, b in busy_runs(records, lo, hi):
+            yield iso_interval(a, b)
+    elif mode == "projects":
+        for r in records:
+            yield "\t".join((iso_interval(max(r[3], lo), min(r[4], hi)), r[1], r[2],
+                             project_status(r[2], r[4], today, r[5])))
+    else:
+        raise ValueError(f"unknown copy mode: {mode!r}")
+
+def iter_text_chunks(lines, max_chars=CLIPBOARD_CHUNK_CHARS):
+    """Group lines into (text, line count) chunks of at most ~max_chars characters."""
+    buf, size = [], 0
+    for line in lines:
+        if buf and size + len(line) + 1 > max_chars:
+            yield "\n".join(buf), len(buf)
+            buf, size = [], 0
+        buf.append(line)
+        size += len(line) + 1
+    if buf:
+        yield "\n".join(buf), len(buf)
+
+# -----------------------
+# Bulk schedule import (CSV / JSON / ICS) on a process pool
+# -----------------------
+# Parsers run in worker processes and must stay free of Qt: they read their own
+# byte range of the file and return (name, ptype, start_jd, end_jd) tuples, plus
+# a dict of ProjectStore.add_rule() arguments for each recurring entry.
+IMPORT_CHUNK_BYTES = 4 * 1024 * 1024
+
+def _iso_jd(text):
+    return _date.fromisoformat(text.strip()[:10]).toordinal() + _JD_ORDINAL_OFFSET
+
+def _import_type(ptype, status=""):
+    if ptype in PALETTE:
+        return ptype
+    if status in PALETTE:
+        return status
+    return "Extra"
+
+def _coalesce_days(records):
+    """Merge same-name/type records on consecutive days (e.g. rows of a per-day export)."""
+    out = []
+    open_runs = {}
+    for name, ptype, start, end in sorted(records, key=lambda r: (r[2], r[3])):
+        run = open_runs.get((name, ptype))
+        if run is not None and start <= run[3] + 1:
+            run[3] = max(run[3], end)
+            continue
+        run = [name, ptype, start, end]
+        open_runs[(name, ptype)] = run
+        out.append(run)
+    return [tuple(r) for r in out]
+
+def _read_chunk_lines(path, start, end):
+    """Whole lines whose first byte lies in [start, end)."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that straddles start
+        pos = f.tell()
+        if pos >= end:
+            return []
+        data = f.read(end - pos)
+        if data and not data.endswith(b"\n"):
+            data += f.readline()  # finish the line that straddles end
+    return data.decode("utf-8", "replace").splitlines()
+
+def _parse_csv_chunk(path, start, end, header):
+    """Rows with start/end (ranges) or a single date column (per-day rows)."""
+    cols = {name.strip().lower(): i for i, name in enumerate(header)}
+    i_name = cols.get("name", cols.get("project"))
+    i_type = cols.get("type", cols.get("ptype"))
+    i_status = cols.get("status")
+    i_start = cols.get("start", cols.get("date"))
+    i_end = cols.get("end")
+    out = []
+    lines = iter(_read_chunk_lines(path, start, end))
+    if start == 0:
+        next(lines, None)  # header
+    for row in csv.reader(lines):
+        if not row or i_start is None or len(row) <= i_start or not row[i_start].strip():
+            continue
+        name = row[i_name].strip() if i_name is not None and len(row) > i_name else ""
+        ptype = row[i_type].strip() if i_type is not None and len(row) > i_type else ""
+        status = row[i_status].strip() if i_status is not None and len(row) > i_status else ""
+        if not name and not ptype:
+            continue  # empty day of an "all days" export
+        try:
+            s = _iso_jd(row[i_start])
+            e = _iso_jd(row[i_end]) if i_end is not None and len(row) > i_end and row[i_end].strip() else s
+        except ValueError:
+            continue
+        ptype = _import_type(ptype, status)
+        out.append((name or ptype, ptype, min(s, e), max(s, e)))
+    return _coalesce_days(out)
+
+def _ics_day(value, is_end):
+    """Julian day of an ICS DATE / DATE-TIME value; all-day and midnight ends are exclusive."""
+    v = value.strip()
+    jd = _date(int(v[0:4]), int(v[4:6]), int(v[6:8])).toordinal() + _JD_ORDINAL_OFFSET
+    if is_end and (len(v) == 8 or v[9:15] == "000000"):
+        jd -= 1
+    return jd
+
+def _ics_rule(value, exdates):
+    """add_rule() arguments (without name, type, start, length) for an RRULE,
+    or None when it uses parts the rules cannot express (e.g. BYDAY=MO,WE)."""
+    parts = dict(p.split("=", 1) for p in value.upper().split(";") if "=" in p)
+    freq = parts.pop("FREQ", "").lower()
+    interval = int(parts.pop("INTERVAL", 1))
+    if freq == "yearly":
+        freq, interval = "monthly", interval * 12
+    count = int(parts["COUNT"]) if "COUNT" in parts else None
+    if freq not in RECUR_FREQS or interval < 1 or (count is not None and count < 1) \
+            or any(k.startswith("BY") for k in parts):
+        return None
+    until = _ics_day(parts["UNTIL"], False) if "UNTIL" in parts else None
+    exceptions = [_ics_day(d, False) for d in exdates.split(",") if d.strip()]
+    return {"freq": freq, "interval": interval, "count": count, "until": until, "exceptions": exceptions}
+
+def _parse_ics_chunk(path, start, end):
+    """VEVENTs whose BEGIN line lies in [start, end)."""
+    out = []
+    event = None
+    lines = _read_chunk_lines(path, start, end)
+    unfolded = []
+    def flush_event(ev):
+        if ev and "DTSTART" in ev:
+            try:
+                s = _ics_day(ev["DTSTART"], False)
+                e = _ics_day(ev["DTEND"], True) if "DTEND" in ev else s
+            except (ValueError, IndexError):
+                return
+            cats = [c.strip() for c in ev.get("CATEGORIES", "").split(",")]
+            ptype = next((c for c in cats if c in PALETTE), "Extra")
+            try:
+                rule = _ics_rule(ev["RRULE"], ev.get("EXDATE", "")) if "RRULE" in ev else None
+            except (ValueError, IndexError):
+                rule = None  # unreadable rule: keep the first occurrence
+            if rule is not None:
+                rule.update(name=ev.get("SUMMARY", ptype), ptype=ptype, start=s, length=max(s, e) - s + 1)
+                out.append(rule)
+                return
+            out.append((ev.get("SUMMARY", ptype), ptype, s, max(s, e)))
+    def handle(line):
+        nonlocal event
+        key, _, value = line.partition(":")
+        key = key.split(";", 1)[0].upper()
+        if key == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif key == "END" and value.upper() == "VEVENT":
+            flush_event(event)
+            event = None
+        elif key == "EXDATE" and event is not None and key in event:
+            event[key] += "," + value  # may be given on several lines
+        elif event is not None:
+            event[key] = value.replace("\\,", ",").replace("\\n", " ")
+    for line in lines:
+        if line.startswith((" ", "\t")) and unfolded:
+            unfolded[-1] += line[1:]  # RFC 5545 line folding
+            continue
+        if unfolded:
+            handle(unfolded.pop())
+        unfolded.append(line)
+    # the last line may be folded across this chunk's end, and the last event
+    # may run past it: keep unfolding and handling lines after end until the
+    # event is finished
+    if unfolded and (event is not None or unfolded[-1].upper().startswith("BEGIN")):
+        with open(path, "rb") as f:
+            f.seek(end - 1)
+            f.readline()  # the line that straddles end is already in lines
+            for raw in f:
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                if line.startswith((" ", "\t")) and unfolded:
+                    unfolded[-1] += line[1:]
+                    continue
+                if unfolded:
+                    handle(unfolded.pop())
+                if event is None:
+                    break
+                unfolded.append(line)
+    if unfolded:
+        handle(unfolded.pop())
+    return out
+
+def _json_entry(item):
+    """A {"name", "type", "start", "end"} object as a record, or as add_rule()
+    arguments when it has "repeat": {"freq", "interval", "count", "until", "except": [dates]}."""
+    s = _iso_jd(item.get("start") or item["date"])
+    e = _iso_jd(item["end"]) if item.get("end") else s
+    ptype = _import_type(item.get("type", ""), item.get("status", ""))
+    rep = item.get("repeat")
+    if rep and rep.get("freq", "weekly") in RECUR_FREQS:
+        return {"name": item.get("name") or ptype, "ptype": ptype, "start": min(s, e),
+                "length": abs(e - s) + 1, "freq": rep.get("freq", "weekly"),
+                "interval": max(1, int(rep.get("interval", 1))),
+                "count": max(1, int(rep["count"])) if rep.get("count") else None,
+                "until": _iso_jd(rep["until"]) if rep.get("until") else None,
+                "exceptions": [_iso_jd(d) for d in rep.get("except", ())]}
+    return (item.get("name") or ptype, ptype, min(s, e), max(s, e))
+
+def _parse_json_file(path):
+    """Either a legacy {'YYYY-MM-DD': [types]} map or a list of objects (see _json_entry)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    out = []
+    if isinstance(data, dict):
+        for day, types in data.items():
+            jd = _iso_jd(day)
+            for t in types or ():
+                out.append((t, _import_type(t), jd, jd))
+        return _coalesce_days(out)
+    return [_json_entry(item) for item in data]
+
+
+class ScheduleImportThread(QThread):
+    """Splits a schedule file into chunks, parses them on a process pool and
+    emits the records in batches (merged into the store on the GUI thread)."""
+    batch = pyqtSignal(list)        # [(name, ptype, start, end), ...]
+    rules_found = pyqtSignal(list)  # [add_rule() keyword arguments, ...]
+    progress = pyqtSignal(int, int) # chunks done, chunks total
+    done = pyqtSignal(int)          # records imported
+    failed = pyqtSignal(str)
+
+    BATCH = 10000
+
+    def __init__(self, path, workers=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+
+    def _tasks(self):
+        ext = os.path.splitext(self.path)[1].lower()
+        if ext == ".json":
+            return [(_parse_json_file, (self.path,))]
+        size = os.path.getsize(self.path)
+        bounds = list(range(0, size, IMPORT_CHUNK_BYTES)) + [size]
+        spans = list(zip(bounds, bounds[1:])) or [(0, 0)]
+        if ext == ".ics":
+            return [(_parse_ics_chunk, (self.path, a, b)) for a, b in spans]
+        with open(self.path, newline='', encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        return [(_parse_csv_chunk, (self.path, a, b, header)) for a, b in spans]
+
+    def _results(self, tasks):
+        """Chunk results in file order; falls back to this thread if no pool can
+        be used, resuming after the chunks the pool already delivered."""
+        yielded = 0
+        if len(tasks) > 1 and self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
+            import pickle
+            try:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as ex:
+                    futures = [ex.submit(fn, *args) for fn, args in tasks]
+                    for fut in futures:
+                        if self.isInterruptionRequested():
+                            ex.shutdown(cancel_futures=True)
+                            return
+                        yield fut.result()
+                        yielded += 1
+                return
+            except (BrokenProcessPool, pickle.PicklingError, AttributeError, OSError):
+                pass  # e.g. module not importable in a spawned child, or a worker killed
+        for fn, args in tasks[yielded:]:
+            if self.isInterruptionRequested():
+                return
+            yield fn(*args)
+
+    def run(self):
+        try:
+            total = 0
+            for out in self._iter_batches():
+                total += len(out)
+                self.batch.emit(out)
+            if self.isInterruptionRequested():
+                return
+            self.done.emit(total)
+        except Exception as ex:
+            self.failed.emit(str(ex))
+
+    def _iter_batches(self):
+        """Parsed records in batches of about BATCH; stops early when interrupted."""
+        tasks = self._tasks()
+        held = {}  # (name, ptype) -> record that may continue into the next chunk
+        out = []
+        for n, records in enumerate(self._results(tasks), 1):
+            rules = [r for r in records if isinstance(r, dict)]
+            if rules:
+                self.rules_found.emit(rules)
+                records = [r for r in records if not isinstance(r, dict)]
+            # stitch per-day runs cut by a chunk boundary back together. The
+            # boundary can fall inside the rows of the chunk's last day, so a
+            # run reaching the day before it may still continue in the next chunk.
+            last_day = max((r[3] for r in records), default=None)
+            continue_from = None if last_day is None else last_day - 1  # None: keep everything held
+            for r in records:
+                key = (r[0], r[1])
+                prev = held.pop(key, None)
+                if prev is not None:
+                    if r[2] <= prev[3] + 1:
+                        r = (prev[0], prev[1], prev[2], max(prev[3], r[3]))
+                    else:
+                        out.append(prev)
+                if r[3] >= continue_from:
+                    held[key] = r
+                else:
+                    out.append(r)
+            if continue_from is not None:
+                for key in [k for k, r in held.items() if r[3] < continue_from]:
+                    out.append(held.pop(key))
+            if len(out) >= self.BATCH:
+                yield out
+                out = []
+            self.progress.emit(n, len(tasks))
+        if self.isInterruptionRequested():
+            return
+        out.extend(held.values())
+        if out:
+            yield out
+
+# -----------------------
+# Live sync from a watched schedule file
+# -----------------------
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ScheduleSyncThread(ScheduleImportThread):
+    """Hashes the schedule file and, if the content changed, parses it and
+    diffs the records and recurring rules against the previous parse, all off
+    the GUI thread. Records and rules are diffed as separate Counters; rules
+    are keyed by rule_key()."""
+    parsed = pyqtSignal(object)  # (digest, counts, added, removed, rule_counts, added_rules, removed_rules), or None
+
+    def __init__(self, path, last_digest=None, last_counts=None, last_rules=None, parent=None):
+        super().__init__(path, parent=parent)
+        self.last_digest = last_digest
+        self.last_counts = last_counts or Counter()
+        self.last_rules = last_rules or Counter()
+        self._rules = Counter()
+        # direct: collected on this thread while _iter_batches runs
+        self.rules_found.connect(self._collect_rules, Qt.ConnectionType.DirectConnection)
+
+    @staticmethod
+    def rule_key(rule):
+        """add_rule() arguments of a RecurrenceRule as a hashable tuple (completion aside)."""
+        return (rule.name, rule.ptype, rule.start, rule.freq, rule.interval, rule.count,
+                rule.until, rule.exceptions, rule.length)
+
+    def _collect_rules(self, rules):
+        self._rules.update(self.rule_key(RecurrenceRule(**r)) for r in rules)
+
+    def run(self):
+        try:
+            digest = file_digest(self.path)
+            if digest == self.last_digest:
+                self.parsed.emit(None)
+                return
+            counts = Counter()
+            for out in self._iter_batches():
+                counts.update(out)
+            if self.isInterruptionRequested():
+                return
+            added = list((counts - self.last_counts).elements())
+            removed = list((self.last_counts - counts).elements())
+            rules = self._rules
+            self.parsed.emit((digest, counts, added, removed, rules,
+                              list((rules - self.last_rules).elements()),
+                              list((self.last_rules - rules).elements())))
+        except Exception as ex:
+            self.failed.emit(str(ex))
+
+
+class ScheduleSync(QObject):
+    """Keeps a store in step with a schedule file (CSV / JSON / ICS) written by
+    another program.
+
+    QFileSystemWatcher changes are debounced; a change whose (mtime, size) or
+    content hash matches the last sync is dropped. Parsing and diffing run on a
+    ScheduleSyncThread, and only the added / removed records are applied, so
+    the GUI-thread cost and the repaint follow the size of the change. Only
+    projects and recurring rules created (or, on the first sync, matched) by
+    the sync are touched.
+    """
+    synced = pyqtSignal(int, int)  # records and rules added, removed
+    failed = pyqtSignal(str)
+
+    def __init__(self, store, path, debounce_ms=300, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.path = os.path.abspath(path)
+        self._owned = {}           # record -> [pids] created / adopted by the sync
+        self._digest = None
+        self._counts = Counter()   # records of the last applied parse
+        self._owned_rules = {}     # ScheduleSyncThread.rule_key -> [rids], as _owned
+        self._rules = Counter()    # rule keys of the last applied parse
+        self._stat = None
+        self._job = None
+        self._again = False        # a change arrived while a parse was running
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._check)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_changed)
+        self.watcher.directoryChanged.connect(self._on_changed)
+        self.watcher.addPath(os.path.dirname(self.path))  # to see the file being replaced
+        self._watch_file()
+        self._check()
+
+    def _watch_file(self):
+        if os.path.exists(self.path) and self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+
+    def _on_changed(self, _path):
+        self._watch_file()  # atomic replace-by-rename drops the file from the watcher
+        self._debounce.start()
+
+    def _check(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return  # not there (yet); the directory watch will tell us
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return
+        if self._job is not None:
+            self._again = True
+            return
+        self._stat = stat
+        job = ScheduleSyncThread(self.path, self._digest, self._counts, self._rules, self)
+        job.parsed.connect(self._apply)
+        job.failed.connect(self._on_failed)
+        job.finished.connect(self._on_job_finished)
+        self._job = job
+        job.start()
+
+    def _on_failed(self, msg):
+        self._stat = None  # e.g. caught mid-write: retry on the next change
+        self.failed.emit(msg)
+
+    def _on_job_finished(self):
+        job, self._job = self._job, None
+        job.deleteLater()
+        if self._again:
+            self._again = False
+            self._check()
+
+    def _adopt(self, counts, added):
+        """First sync: match records already in the store (e.g. from the database)."""
+        lo = min(r[2] for r in added); hi = max(r[3] for r in added)
+        want = Counter(counts)
+        for rec in self.store.export_records(lo, hi):
+            key = (rec[1], rec[2], rec[3], rec[4])
+            if want[key] > 0:
+                want[key] -= 1
+                self._owned.setdefault(key, []).append(rec[0])
+        adopted = Counter({k: len(v) for k, v in self._owned.items()})
+        out = []
+        for key in added:
+            if adopted[key] > 0:
+                adopted[key] -= 1
+            else:
+                out.append(key)
+        return out
+
+    def _adopt_rules(self, added):
+        """First sync: match rules already in the store, as _adopt does for records."""
+        free = {}
+        for rule in self.store.rules:
+            free.setdefault(ScheduleSyncThread.rule_key(rule), []).append(rule.rid)
+        out = []
+        for key in added:
+            if free.get(key):
+                self._owned_rules.setdefault(key, []).append(free[key].pop())
+            else:
+                out.append(key)
+        return out
+
+    def _apply(self, result):
+        if result is None:
+            return  # touched, same content
+        digest, counts, added, removed, rule_counts, added_rules, removed_rules = result
+        if self._digest is None and added and len(self.store):
+            added = self._adopt(counts, added)
+        if self._digest is None and added_rules and len(self.store.rules):
+            added_rules = self._adopt_rules(added_rules)
+        n_rules = 0
+        for key in removed_rules:
+            rids = self._owned_rules.get(key)
+            if rids:
+                self.store.remove_rule(rids.pop())
+                n_rules += 1
+                if not rids:
+                    del self._owned_rules[key]
+        for key in added_rules:
+            self._owned_rules.setdefault(key, []).append(self.store.add_rule(*key).rid)
+        remove_pids = []
+        for key in removed:
+            pids = self._owned.get(key)
+            if pids:
+                remove_pids.append(pids.pop())
+                if not pids:
+                    del self._owned[key]
+        new_pids = self.store.apply_delta(remove_pids, added)
+        for key, pid in zip(added, new_pids):
+            self._owned.setdefault(key, []).append(pid)
+        self._digest, self._counts, self._rules = digest, counts, rule_counts
+        self.synced.emit(len(added) + len(added_rules), len(remove_pids) + n_rules)
+
+    def stop(self):
+        self._debounce.stop()
+        self.watcher.removePaths(self.watcher.files() + self.watcher.directories())
+        if self._job is not None:
+            self._job.requestInterruption()
+            self._job.wait()
+
+# -----------------------
+# Local control API: JSON-lines commands on a QLocalServer
+# -----------------------
+IPC_NAME = "floating-calendar"
+
+def ipc_server_name():
+    # per user, so two people on one machine each get their own instance
+    import getpass
+    return f"{IPC_NAME}-{getpass.getuser()}"
+
+def forward_to_running(argv, name=None, timeout_ms=500):
+    """Hand a command line to an instance already listening on name.
+    Returns False when there is none (this process should start the window)."""
+    sock = QLocalSocket()
+    sock.connectToServer(name or ipc_server_name())
+    if not sock.waitForConnected(timeout_ms):
+        return False
+    sock.write((json.dumps({"cmd": "args", "argv": list(argv), "cwd": os.getcwd()}) + "\n").encode())
+    sock.waitForBytesWritten(timeout_ms)
+    sock.waitForReadyRead(timeout_ms)  # the reply; the instance is there either way
+    sock.disconnectFromServer()
+    return True
+
+
+class ControlServer(QObject):
+    """Control API for scripts on a QLocalServer (a Unix domain socket, or a
+    named pipe on Windows) that only the current user can connect to.
+
+    Each line is one JSON command; each gets a one-line JSON reply, in order,
+    with "ok" and the command's "id" if it had one. Dates are 'YYYY-MM-DD'.
+        {"cmd": "add", "projects": [{"name", "type", "start", "end", "repeat"?}, ...]}
+        {"cmd": "remove", "pids": [...]}          (negative pids are rules)
+        {"cmd": "remove", "start", "end", "type"?}
+        {"cmd": "update", "projects": [{"pid", "name"?, "type"?, "start"?, "end"?, "done"?}, ...]}
+        {"cmd": "done", "start", "end", "done"?}
+        {"cmd": "query", "start"?, "end"?}        (default: the visible page)
+        {"cmd": "args", "argv": [...], "cwd"}     (a second launch, see forward_to_running)
+
+    Commands are queued and run once per frame within FRAME_BUDGET_MS, so the
+    store changes of a frame are diffed and repainted together however many
+    commands arrive. A client is not read while it has MAX_PENDING commands
+    queued or MAX_UNSENT reply bytes it has not read; its writes then block
+    on the full socket buffer (backpressure).
+    """
+    FRAME_MS = 16
+    FRAME_BUDGET_MS = 8
+    MAX_PENDING = 256
+    MAX_UNSENT = 1 << 20
+    MAX_LINE = 16 << 20     # read buffer size; a longer command is rejected
+
+    def __init__(self, window, name=None, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.name = name or ipc_server_name()
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._on_connection)
+        self._queues = {}      # socket -> deque of command lines
+        self._closed = set()   # disconnected sockets whose commands still run
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.FRAME_MS)
+        self._timer.timeout.connect(self._run_frame)
+
+    @property
+    def store(self):
+        return self.window.calendar.store
+
+    def listen(self):
+        if self.server.listen(self.name):
+            return True
+        # left behind by a crashed instance (a live one would have taken our arguments)
+        QLocalServer.removeServer(self.name)
+        return self.server.listen(self.name)
+
+    def close(self):
+        self._timer.stop()
+        for sock in list(self._queues):
+            sock.abort()
+        self._queues.clear()
+        self._closed.clear()
+        self.server.close()
+
+    def _on_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            sock.setReadBufferSize(self.MAX_LINE)
+            self._queues[sock] = deque()
+            sock.readyRead.connect(lambda s=sock: self._read(s))
+            sock.bytesWritten.connect(lambda _n, s=sock: self._read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _read(self, sock, limit=True):
+        q = self._queues.get(sock)
+        if q is None:
+            return
+        while sock.canReadLine() and not (limit and (len(q) >= self.MAX_PENDING
+                                                     or sock.bytesToWrite() >= self.MAX_UNSENT)):
+            line = bytes(sock.readLine()).strip()
+            if line:
+                q.append(line)
+        if not sock.canReadLine() and sock.bytesAvailable() >= self.MAX_LINE:
+            sock.write(self.run(b""))  # cannot find where it ends: give up on this client
+            sock.readAll()
+            sock.disconnectFromServer()
+            return
+        if q and not self._timer.isActive():
+            self._timer.start()
+
+    def _on_disconnected(self, sock):
+        # a fire-and-forget client: its commands still run, without replies
+        if sock.isOpen():
+            self._read(sock, limit=False)
+        if sock.isOpen() and sock.bytesAvailable():
+            self._queues[sock].append(bytes(sock.readAll()).strip())  # last line without a newline
+        self._closed.add(sock)
+        if not self._queues.get(sock):
+            self._forget(sock)
+
+    def _forget(self, sock):
+        self._queues.pop(sock, None)
+        self._closed.discard(sock)
+        sock.deleteLater()
+
+    def _run_frame(self):
+        deadline = time.perf_counter() + self.FRAME_BUDGET_MS / 1000
+        pending = True
+        while pending and time.perf_counter() < deadline:
+            pending = False
+            for sock, q in list(self._queues.items()):
+                if not q:
+                    continue
+                reply = self.run(q.popleft())
+                if sock not in self._closed:
+                    sock.write(reply)
+                pending = pending or bool(q)
+        for sock, q in list(self._queues.items()):
+            if sock in self._closed:
+                if not q:
+                    self._forget(sock)
+            else:
+                self._read(sock)  # room again in the queue
+        if any(self._queues.values()):
+            self._timer.start()
+
+    def run(self, line):
+        """Run one command line and return the reply line (bytes)."""
+        cmd = None
+        try:
+            if not line:
+                raise ValueError(f"command longer than {self.MAX_LINE} bytes")
+            cmd = json.loads(line)
+            if not isinstance(cmd, dict):
+                raise ValueError("a command must be a JSON object")
+            handler = getattr(self, f"_cmd_{cmd.get('cmd')}", None)
+            if handler is None:
+                raise ValueError(f"unknown command: {cmd.get('cmd')!r}")
+            out = handler(cmd) or {}
+            out["ok"] = True
+        except (ValueError, KeyError, TypeError, AttributeError) as ex:
+            out = {"ok": False, "error": f"{type(ex).__name__}: {ex}"}
+        if isinstance(cmd, dict) and "id" in cmd:
+            out["id"] = cmd["id"]
+        return (json.dumps(out) + "\n").encode()
+
+    def _cmd_add(self, cmd):
+        entries = [_json_entry(item) for item in cmd["projects"]]
+        rows = [e for e in entries if not isinstance(e, dict)]
+        rules = [self.store.add_rule(**e).rid for e in entries if isinstance(e, dict)]
+        return {"pids": self.store.apply_delta((), rows), "rules": rules}
+
+    def _cmd_remove(self, cmd):
+        if "pids" not in cmd:
+            return {"removed": self.store.remove_range(cmd["start"], cmd.get("end"), cmd.get("type"))}
+        pids = [int(p) for p in cmd["pids"]]
+        for pid in pids:
+            if pid < 0:
+                self.store.remove_rule(-pid)
+        self.store.apply_delta([pid for pid in pids if pid > 0])
+
+    def _cmd_update(self, cmd):
+        keys = {"name": "name", "type": "ptype", "start": "start", "end": "end", "done": "done"}
+        for item in cmd["projects"]:
+            fields = {keys[k]: v for k, v in item.items() if k in keys}
+            if "done" in fields:
+                fields["done"] = self._flag(fields["done"], "done")
+            self.store.update(int(item["pid"]), **fields)
+
+    def _cmd_done(self, cmd):
+        done = self._flag(cmd.get("done", True), "done")
+        return {"changed": self.store.mark_done(cmd["start"], cmd.get("end"), done)}
+
+    @staticmethod
+    def _flag(value, key):
+        # bool("false") is True: only a JSON true / false is accepted
+        if not isinstance(value, bool):
+            raise ValueError(f"{key} must be true or false, not {value!r}")
+        return value
+
+    def _cmd_query(self, cmd):
+        calendar = self.window.calendar
+        if "start" in cmd:
+            lo, hi = to_jd(cmd["start"]), to_jd(cmd.get("end") or cmd["start"])
+        else:
+            lo, hi = calendar.visible_range()
+        today = calendar.status.today
+        return {"projects": [{"pid": pid, "name": name, "type": ptype, "start": jd_to_iso(s), "end": jd_to_iso(e),
+                              "done": bool(done), "status": project_status(ptype, e, today, done)}
+                             for pid, name, ptype, s, e, done
+                             in self.store.export_records(min(lo, hi), max(lo, hi), recurring=True)]}
+
+    def _cmd_args(self, cmd):
+        self.window.handle_args([str(a) for a in cmd.get("argv", ())], cmd.get("cwd"))
+
+# -----------------------
+# LRU cache of pre-rendered day cells
+# -----------------------
+class CellPixmapCache:
+    """Pre-rendered cell pixmaps keyed on (shown project-type id tuple, overflow
+    count, cell width, cell height, device pixel ratio, is_today).
+
+    Least recently used entries are evicted once the cached pixmaps exceed
+    max_bytes. The cache drops everything when PALETTE / GRID_PLACEHOLDER change.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (pixmap, cost)
+        self._bytes = 0
+        self._palette_sig = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def used_bytes(self):
+        return self._bytes
+
+    def get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, pix):
+        cost = pix.width() * pix.height() * 4
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._items[key] = (pix, cost)
+        self._bytes += cost
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, c) = self._items.popitem(last=False)
+            self._bytes -= c
+
+    def clear(self):
+        self._items.clear()
+        self._bytes = 0
+
+    def check_palette(self):
+        sig = (tuple(PALETTE.items()), GRID_PLACEHOLDER)
+        if sig != self._palette_sig:
+            self.clear()
+            self._palette_sig = sig
+
+# -----------------------
+# Per-page pre-pass: everything paintCell needs for the 6x7 grid at once
+# -----------------------
+_np = False  # numpy once _numpy() has tried to import it (None if it is not installed)
+
+def _numpy():
+    """numpy, imported on first use: it adds ~100 ms to startup and only pays
+    off for very busy pages. None when it is not installed."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = None
+    return _np
+
+
+class PageGrid:
+    """Counts, layout mode, colour ids, overflow and past/today/future for the
+    42 cells of a page, computed in one pass over the page's projects (plain
+    Python; NumPy, if installed, for pages with more than NUMPY_MIN projects).
+    All fields are plain lists so paintCell only indexes them."""
+    CELLS = 42
+    MAX_SHOWN = 9            # 3x3 grid; the rest goes to the +N badge
+    EMPTY, STRIPS, GRID = 0, 1, 2
+    NUMPY_MIN = 2000         # below this the Python pass is as fast (and needs no import)
+    CHUNK = 4096             # projects per NumPy block (bounds the 42 x m mask)
+    __slots__ = ("lo", "today", "counts", "modes", "tids", "overflow", "when")
+
+    def __init__(self, lo, today, projects):
+        # projects: overlapping [lo, lo + 41], in display (creation) order;
+        # each is shown in its derived status colour as of today (display_tid)
+        self.lo = lo
+        self.today = today
+        if len(projects) > self.NUMPY_MIN and _numpy() is not None:
+            counts, tids = self._fill_numpy(lo, today, projects)
+        else:
+            counts, tids = self._fill_python(lo, today, projects)
+        self.counts = counts
+        self.tids = tids
+        self.overflow = [max(0, n - self.MAX_SHOWN) for n in counts]
+        self.modes = [self.EMPTY if n == 0 else self.STRIPS if n <= 4 else self.GRID for n in counts]
+        self.when = [(d > today) - (d < today) for d in range(lo, lo + self.CELLS)]
+
+    @classmethod
+    def _fill_python(cls, lo, today, projects):
+        counts = [0] * cls.CELLS
+        cells = [[] for _ in range(cls.CELLS)]
+        for p in projects:
+            tid = display_tid(p, today)
+            for i in range(max(p.start - lo, 0), min(p.end - lo, cls.CELLS - 1) + 1):
+                counts[i] += 1
+                if len(cells[i]) < cls.MAX_SHOWN:
+                    cells[i].append(tid)
+        return counts, [tuple(c) for c in cells]
+
+    @classmethod
+    def _fill_numpy(cls, lo, today, projects):
+        np = _numpy()
+        k = len(projects)
+        starts = np.fromiter((p.start for p in projects), np.int64, k) - lo
+        ends = np.fromiter((p.end for p in projects), np.int64, k) - lo
+        tidarr = np.fromiter((display_tid(p, today) for p in projects), np.int64, k)
+        days = np.arange(cls.CELLS)[:, None]
+        filled = np.zeros(cls.CELLS, np.int64)
+        shown = np.full((cls.CELLS, cls.MAX_SHOWN), -1, np.int64)
+        for c0 in range(0, k, cls.CHUNK):
+            cov = (starts[None, c0:c0 + cls.CHUNK] <= days) & (ends[None, c0:c0 + cls.CHUNK] >= days)
+            rank = np.cumsum(cov, axis=1) + filled[:, None]  # 1-based slot per cell
+            r, c = np.nonzero(cov & (rank <= cls.MAX_SHOWN))
+            shown[r, rank[r, c] - 1] = tidarr[c0 + c]
+            filled += cov.sum(axis=1)
+        counts = filled.tolist()
+        return counts, [tuple(row[:min(n, cls.MAX_SHOWN)]) for row, n in zip(shown.tolist(), counts)]
+
+    def cell(self, i):
+        """What the i-th cell shows (equal tuples paint identically)."""
+        return self.tids[i], self.overflow[i], self.when[i] == 0
+
+# -----------------------
+# Workload heatmap: per-day load from difference arrays over project ranges
+# -----------------------
+# weight of one project per type in the weighted heatmap (unlisted types count 1);
+# finished projects weigh nothing there, the plain count still includes them
+LOAD_WEIGHTS = {
+    "Fabrication":  1.0,
+    "Installation": 1.0,
+    "Inspection":   0.5,
+    "Handover":     0.5,
+    "Tentative":    0.25,
+    "Completed":    0.0,
+}
+
+# heatmap ramp: index 0 is an idle day, the last one the busiest of the page
+HEAT_COLORS = ("#0f172a", "#1e3a5f", "#1d4ed8", "#0ea5e9", "#facc15", "#f97316", "#ef4444")
+
+class LoadProfile:
+    """Load per day over [lo, hi]: the number of concurrent projects, or their
+    summed LOAD_WEIGHTS when weights is given.
+
+    Built in O(records + days): each record adds its weight at its first day and
+    takes it off after its last one in a difference array, a prefix sum of that
+    is the load per day and a prefix sum of the loads gives range totals, so
+    load() and total() are O(1). peak() reads a sparse table of range maxima
+    (O(days log days) to build, O(1) per query).
+
+    apply() updates the loads in place for changed records, in O(changed
+    record-days) plus an O(days) prefix sum; the sparse table is then dropped
+    and peak() scans the range instead."""
+    __slots__ = ("lo", "hi", "weights", "loads", "_cum", "_max")
+
+    def __init__(self, lo, hi, records, weights=None):
+        # records: export_records() tuples (pid, name, ptype, start, end, done)
+        self.lo = lo
+        self.hi = hi
+        self.weights = weights
+        n = hi - lo + 1
+        diff = [0] * (n + 1)
+        for _pid, _name, ptype, start, end, done in records:
+            a = max(start, lo) - lo
+            b = min(end, hi) - lo
+            if a > b:
+                continue
+            w = self._weight(ptype, done)
+            diff[a] += w
+            diff[b + 1] -= w
+        self.loads = list(accumulate(diff[:n]))
+        self._cum = [0]
+        self._cum.extend(accumulate(self.loads))
+        # _max[k][i] = max(loads[i : i + 2**k])
+        self._max = [self.loads]
+        span = 1
+        while span * 2 <= n:
+            prev = self._max[-1]
+            self._max.append([max(prev[i], prev[i + span]) for i in range(n - 2 * span + 1)])
+            span *= 2
+
+    def _weight(self, ptype, done):
+        return 1 if self.weights is None else 0 if done else self.weights.get(ptype, 1)
+
+    def apply(self, removed, added):
+        """Take the old versions of changed records off and put the new ones on
+        (ChangeTracker.diff() lists)."""
+        loads, lo, hi = self.loads, self.lo, self.hi
+        for records, sign in ((removed, -1), (added, 1)):
+            for _pid, _name, ptype, start, end, done in records:
+                w = sign * self._weight(ptype, done)
+                if w:
+                    for i in range(max(start, lo) - lo, min(end, hi) - lo + 1):
+                        loads[i] += w
+        self._cum = [0]
+        self._cum.extend(accumulate(loads))
+        self._max = None
+
+    def covers(self, lo, hi):
+        return self.lo <= lo and hi <= self.hi
+
+    def load(self, day):
+        return self.loads[day - self.lo]
+
+    def total(self, lo, hi):
+        """Summed load of the days lo..hi (project-days for the plain count)."""
+        return self._cum[hi - self.lo + 1] - self._cum[lo - self.lo]
+
+    def peak(self, lo, hi):
+        """Highest load of a single day in lo..hi."""
+        a, b = lo - self.lo, hi - self.lo
+        if self._max is None:
+            return max(self.loads[a:b + 1])  # changed since it was built
+        k = (b - a + 1).bit_length() - 1
+        row = self._max[k]
+        return max(row[a], row[b - (1 << k) + 1])
+
+def heat_level(value, peak):
+    """Index into HEAT_COLORS for a day's load relative to the page peak."""
+    if value <= 0 or peak <= 0:
+        return 0
+    top = len(HEAT_COLORS) - 1
+    return max(1, min(top, int(-(-value * top // peak))))
+
+# -----------------------
+# Day cell rendering (shared by the month view and the overview)
+# -----------------------
+def render_day_cell(painter, rect, projects, is_today, overflow=0):
+    """Paint background, project strips / 3x3 grid, +N badge and today outline into rect.
+    projects: interned type ids shown (at most 9), in display order; overflow: the rest.
+    Shared by the month view and the overview tiles; small rects (< 32 px high,
+    overview) get tighter padding and a badge scaled to the cell."""
+    small = rect.height() < 32
+    # fill base background (transparent-ish)
+    painter.setPen(Qt.GlobalColor.transparent)
+    painter.setBrush(qcolor("#0f172a"))  # matches window background
+    painter.drawRect(rect)
+
+    count = len(projects) + overflow
+
+    # if has projects, draw according to rules
+    if count > 0:
+        if count <= 4:
+            # horizontal strips: split rect.height into count slices
+            slice_h = rect.height() / count
+            for i, proj in enumerate(projects[:4]):  # cap to 4 (but rule allows 4)
+                y = rect.top() + int(i * slice_h)
+                h = int(slice_h) + (1 if i == count-1 else 0)  # fix rounding on last
+                if small:
+                    r = QRect(rect.left()+1, y, rect.width()-2, max(1, h-1))
+                else:
+                    r = QRect(rect.left()+2, y+2, rect.width()-4, h-4)  # small inner padding
+                color_hex = type_color(proj)
+                painter.setBrush(qcolor(color_hex))
+                painter.setPen(Qt.GlobalColor.transparent)
+                painter.drawRect(r)
+        else:
+            # 5..9 -> 3x3 grid
+            # compute cell size with small padding
+            pad = 1 if small else 4
+            gap = 1 if small else 2
+            grid_w = rect.width() - pad*2
+            grid_h = rect.height() - pad*2
+            cell_w = grid_w // 3
+            cell_h = grid_h // 3
+            # fill each grid cell
+            for idx in range(9):
+                row = idx // 3
+                col = idx % 3
+                cx = rect.left() + pad + col * cell_w
+                cy = rect.top() + pad + row * cell_h
+                cw = cell_w - gap
+                ch = cell_h - gap
+                cell_rect = QRect(cx + gap//2, cy + gap//2, cw, ch)
+                if idx < min(count, 9):
+                    proj = projects[idx]
+                    color_hex = type_color(proj)
+                    painter.setBrush(qcolor(color_hex))
+                else:
+                    painter.setBrush(qcolor(GRID_PLACEHOLDER))  # placeholder
+                painter.setPen(Qt.GlobalColor.transparent)
+                painter.drawRect(cell_rect)
+
+            # if more than 9 -> badge will be drawn below
 
-def qcolor(hexstr):
-    return QColor(hexstr)
+    # If there are >9 projects, draw +N badge bottom-right
+    if count > 9:
+        extra = count - 9
+        badge_text = f"+{extra}"
+        # badge rect
+        if small:
+            badge_w = max(10, rect.width() * 2 // 3)
+            badge_h = max(7, rect.height() // 2)
+            bx = rect.right() - badge_w
+            by = rect.bottom() - badge_h
+            radius = 2
+        else:
+            badge_w = 28
+            badge_h = 16
+            bx = rect.right() - badge_w - 6
+            by = rect.bottom() - badge_h - 6
+            radius = 6
+        badge_rect = QRect(bx, by, badge_w, badge_h)
+        painter.setBrush(qcolor("#0f172a"))
+        painter.setPen(qcolor("#cfe8ff"))
+        painter.drawRoundedRect(badge_rect, radius, radius)
+        font2 = QFont()
+        if small:
+            font2.setPixelSize(badge_h - 1)
+        else:
+            font2.setPointSize(8)
+        painter.setFont(font2)
+        painter.drawText(badge_rect, Qt.AlignmentFlag.AlignCenter, badge_text)
 
-def color_swatch_pix(hexcolor, size=14):
-    pix = QPixmap(size, size)
-    pix.fill(Qt.GlobalColor.transparent)
-    p = QPainter(pix)
-    p.setPen(Qt.GlobalColor.transparent)
-    p.setBrush(qcolor(hexcolor))
-    p.setRenderHint(QPainter.RenderHint.Antialiasing)
-    p.drawRoundedRect(0, 0, size-1, size-1, 3, 3)
-    p.end()
-    return pix
+    # If date is today, draw a subtle outline or mark
+    if is_today:
+        draw_today_outline(painter, rect)
+
+def draw_today_outline(painter, rect):
+    pen = painter.pen()
+    pen.setColor(qcolor("#38bdf8"))
+    pen.setWidth(1)
+    painter.setPen(pen)
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    painter.drawRect(rect.adjusted(1,1,-1,-1))
+
+def render_heat_cell(painter, rect, level, label, is_today):
+    """Heatmap cell: filled in HEAT_COLORS[level], with the day's load bottom-right."""
+    painter.setPen(Qt.GlobalColor.transparent)
+    painter.setBrush(qcolor("#0f172a"))
+    painter.drawRect(rect)
+    if level > 0:
+        painter.setBrush(qcolor(HEAT_COLORS[level]))
+        painter.drawRoundedRect(rect.adjusted(2, 2, -2, -2), 4, 4)
+    if label:
+        font = QFont()
+        font.setPointSize(8)
+        painter.setFont(font)
+        painter.setPen(qcolor("#0f172a") if level >= len(HEAT_COLORS) - 3 else qcolor("#cfe8ff"))
+        painter.drawText(rect.adjusted(4, 4, -6, -4), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom, label)
+    if is_today:
+        draw_today_outline(painter, rect)
 
 # -----------------------
 # Custom calendar which paints multiple project colors inside each day cell
 # -----------------------
 class CustomCalendar(QCalendarWidget):
+    # "projects" draws the project colours; the heatmap modes colour days by load
+    DISPLAY_MODES = ("projects", "count", "weighted")
+    # selection overlay role of a day (see selection_role)
+    SEL_NONE, SEL_IN, SEL_END, SEL_PREVIEW = range(4)
+    projectsChanged = pyqtSignal(int, int)  # days touched (lo, hi), once per tick with changes
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        # Mapping: 'YYYY-MM-DD' -> list of project-type strings (ordered)
-        self.project_map = {}
+        # Project records indexed by date range; project_map is a legacy view over it
+        self.store = ProjectStore()
+        self.store.add_listener(self._on_store_changing)
+        self.history = UndoHistory(self.store)
+        self.search = SearchIndex(self.store, self)
+        # search bar matches: their cells are outlined, the others dimmed
+        self._highlight = None    # set of ids (see SearchMatch), or None
+        self._hits = None         # (PageGrid, per-cell flags) for the highlight
+        self.display_mode = "projects"
+        self._load = None         # LoadProfile of the heatmap weighting, patched on changes
+        self._load_changes = ChangeTracker(self.store)  # records changed under _load this tick
+        self._load_rules = None   # rid -> rule before the first rule change under _load this tick
+        # selection overlay: (first, last, hover) Julian days; last is None while
+        # only the first day is picked, and hover then previews the range
+        self._selection = (None, None, None)
+        # derived statuses; day rollovers are repainted like store changes
+        self.status = StatusEngine(self.store, self)
+        self.status.add_listener(self._on_store_changing)
+        self.currentPageChanged.connect(self._on_page_changed)
+        # pending delta repaint: page snapshot taken before the first change of this tick
+        self._before = None       # (page_lo, PageGrid)
+        self._dirty_ranges = []
+        self._flush_scheduled = False
+        self._changed_span = None  # (lo, hi) of the days touched this tick
         # allow keyboard focus
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         # make sure grid not shown; we custom paint
         self.setGridVisible(False)
+        # the day grid is an internal QTableView; keep it for targeted repaints
+        self._view = self.findChild(QTableView)
+        # pre-rendered cells; validated once per viewport paint, dropped on resize
+        self.cell_cache = CellPixmapCache()
+        # per-page pre-pass, rebuilt on the first paint after the page/data/day changed
+        self._grid = None
+        self._view.viewport().installEventFilter(self)
+        self._view.viewport().setMouseTracking(True)  # hover preview of the range
+
+    def viewport(self):
+        """Viewport of the internal day grid (QCalendarWidget has none of its own)."""
+        return self._view.viewport()
+
+    @property
+    def project_map(self):
+        """Legacy 'YYYY-MM-DD' -> [types] view, computed from the store on access."""
+        return ProjectMapView(self.store)
+
+    @project_map.setter
+    def project_map(self, project_map):
+        self.set_project_map(project_map)
 
     def set_project_map(self, project_map):
-        """project_map: dict 'YYYY-MM-DD' -> list of project type names (strings)"""
-        self.project_map = project_map or {}
-        self.viewport().update()  # repaint
+        """project_map: dict 'YYYY-MM-DD' -> list of project type names (strings)
+        Compatibility shim: the map is coalesced into project records in the store."""
+        self.store.load_day_map(project_map)  # repaints only the cells that changed
 
-    def paintCell(self, painter: QPainter, rect: QRect, date: QDate):
-        """Override to paint our multi-project visuals"""
-        painter.save()
+    def set_store(self, store):
+        self.store.remove_listener(self._on_store_changing)
+        self.store = store
+        self.status.store = store
+        self.history.set_store(store)
+        self.search.set_store(store)
+        store.add_listener(self._on_store_changing)
+        self._before = None
+        self._dirty_ranges = []
+        self._grid = None
+        self._load = None
+        self._load_changes = ChangeTracker(store)
+        self._load_rules = None
+        store.ensure_loaded(*self.visible_range())
+        self.viewport().update()
 
-        # fill base background (transparent-ish)
-        # call default background (we'll draw date number ourselves later)
-        painter.setPen(Qt.GlobalColor.transparent)
-        painter.setBrush(qcolor("#0f172a"))  # matches window background
-        painter.drawRect(rect)
-
-        key = date.toString("yyyy-MM-dd")
-        projects = self.project_map.get(key, [])
-        count = len(projects)
-
-        # if has projects, draw according to rules
-        if count > 0:
-            if count <= 4:
-                # horizontal strips: split rect.height into count slices
-                slice_h = rect.height() / count
-                for i, proj in enumerate(projects[:4]):  # cap to 4 (but rule allows 4)
-                    y = rect.top() + int(i * slice_h)
-                    h = int(slice_h) + (1 if i == count-1 else 0)  # fix rounding on last
-                    r = QRect(rect.left()+2, y+2, rect.width()-4, h-4)  # small inner padding
-                    color_hex = PALETTE.get(proj, PALETTE.get("Extra"))
-                    painter.setBrush(qcolor(color_hex))
-                    painter.setPen(Qt.GlobalColor.transparent)
-                    painter.drawRect(r)
-                # If there are more than 4 but <=4 branch won't happen; counted above
+    def set_database(self, db, prefetch_days=31):
+        """Back the calendar with a ProjectDatabase, loading it one page window at a time."""
+        self.set_store(DatabaseProjectStore(db, prefetch_days))
+
+    def _on_page_changed(self, year, month):
+        self._grid = None
+        lo, hi = self.visible_range()
+        self.store.ensure_loaded(lo, hi)
+        # expand recurring rules for the neighbouring pages too (memoised per month)
+        self.store.rules.prefetch(lo - 31, hi + 31)
+
+    # Delta API: each call goes through the store, which reports the touched
+    # range; all changes of one event-loop tick are diffed and repainted together.
+    def add_projects(self, start, end=None, types=()):
+        """Add one project per type covering [start, end]."""
+        return [self.store.add(t, t, start, end) for t in types]
+
+    def remove_projects(self, start, end=None, ptype=None):
+        """Remove all projects (or only those of ptype) from [start, end]."""
+        return self.store.remove_range(start, end, ptype)
+
+    def mark_done(self, start, end=None, done=True):
+        """Set (or clear) the completion flag of the projects on [start, end]."""
+        return self.store.mark_done(start, end, done)
+
+    def replace_projects(self, start, end=None, types=()):
+        """Replace whatever is scheduled on [start, end] with one project per type."""
+        self.store.remove_range(start, end)
+        return self.add_projects(start, end, types)
+
+    def visible_range(self):
+        """(first, last) Julian days of the 6x7 grid currently shown."""
+        first = QDate(self.yearShown(), self.monthShown(), 1)
+        offset = (first.dayOfWeek() - self.firstDayOfWeek().value) % 7
+        if offset == 0:
+            offset = 7  # QCalendarWidget always shows some of the previous month
+        lo = first.toJulianDay() - offset
+        return lo, lo + 41
+
+    def visible_projects(self):
+        lo, hi = self.visible_range()
+        return self.store.query(lo, hi, recurring=True)
+
+    def cell_rect(self, day):
+        """Viewport rect of the cell showing day, or None if it is not on the page."""
+        lo, hi = self.visible_range()
+        jd = to_jd(day)
+        if not lo <= jd <= hi:
+            return None
+        row, col = divmod(jd - lo, 7)
+        if self.horizontalHeaderFormat() != QCalendarWidget.HorizontalHeaderFormat.NoHorizontalHeader:
+            row += 1
+        if self.verticalHeaderFormat() != QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader:
+            col += 1
+        return self._view.visualRect(self._view.model().index(row, col))
+
+    def day_at(self, pos):
+        """Julian day of the cell at viewport position pos, or None (headers, outside)."""
+        index = self._view.indexAt(pos)
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if self.horizontalHeaderFormat() != QCalendarWidget.HorizontalHeaderFormat.NoHorizontalHeader:
+            row -= 1
+        if self.verticalHeaderFormat() != QCalendarWidget.VerticalHeaderFormat.NoVerticalHeader:
+            col -= 1
+        if row < 0 or col < 0:
+            return None
+        return self.visible_range()[0] + row * 7 + col
+
+    # Selection overlay: drawn by paintCell over the cached cell, so changing
+    # it repaints only the cells whose role changes and never re-renders strips.
+    def set_selection(self, first=None, last=None):
+        """Show the days first..last as selected; last None marks only first
+        and previews first..(hovered day) while the pointer moves."""
+        if first is not None and last is not None and last < first:
+            first, last = last, first
+        self._set_selection_state((first, last, self._selection[2]))
+
+    def set_hover(self, day):
+        if day != self._selection[2]:
+            self._set_selection_state(self._selection[:2] + (day,))
+
+    @classmethod
+    def _selection_span(cls, state):
+        first, last, hover = state
+        if first is None:
+            return None
+        if last is not None:
+            return first, last
+        if hover is not None:
+            return min(first, hover), max(first, hover)
+        return first, first
+
+    @classmethod
+    def selection_role(cls, state, day):
+        """SEL_END for the picked days, SEL_IN between them, SEL_PREVIEW for the
+        hover preview before the second day is picked, SEL_NONE otherwise."""
+        first, last, hover = state
+        if first is None:
+            return cls.SEL_NONE
+        if day == first or day == last:
+            return cls.SEL_END
+        span = cls._selection_span(state)
+        if not span[0] <= day <= span[1]:
+            return cls.SEL_NONE
+        return cls.SEL_IN if last is not None else cls.SEL_PREVIEW
+
+    def _set_selection_state(self, state):
+        old, self._selection = self._selection, state
+        if self._selection_span(old) == self._selection_span(state) and old[:2] == state[:2]:
+            return  # e.g. hovering without a range being picked
+        # repaint the cells whose role differs, within the old and new spans
+        lo, hi = self.visible_range()
+        region = QRegion()
+        for span in {self._selection_span(old), self._selection_span(state)} - {None}:
+            for day in range(max(span[0], lo), min(span[1], hi) + 1):
+                if self.selection_role(old, day) != self.selection_role(state, day):
+                    r = self.cell_rect(day)
+                    if r is not None:
+                        region += r
+        if not region.isEmpty():
+            self.viewport().update(region)
+
+    def _on_store_changing(self, lo, hi):
+        load = self._load
+        if load is not None and lo <= load.hi and hi >= load.lo:
+            if self.store.reloading:
+                self._drop_load()  # rebuilt on next use
+            elif self.store.rules_changing:
+                # rules are replaced, never edited, so the old objects are the before state
+                if self._load_rules is None:
+                    self._load_rules = {r.rid: r for r in self.store.rules}
             else:
-                # 5..9 -> 3x3 grid
-                # compute cell size with small padding
-                pad = 4
-                grid_w = rect.width() - pad*2
-                grid_h = rect.height() - pad*2
-                cell_w = grid_w // 3
-                cell_h = grid_h // 3
-                # fill each grid cell
-                for idx in range(9):
-                    row = idx // 3
-                    col = idx % 3
-                    cx = rect.left() + pad + col * cell_w
-                    cy = rect.top() + pad + row * cell_h
-                    cw = cell_w - 2
-                    ch = cell_h - 2
-                    cell_rect = QRect(cx+1, cy+1, cw, ch)
-                    if idx < min(count, 9):
-                        proj = projects[idx]
-                        color_hex = PALETTE.get(proj, PALETTE.get("Extra"))
-                        painter.setBrush(qcolor(color_hex))
-                    else:
-                        painter.setBrush(qcolor(GRID_PLACEHOLDER))  # placeholder
-                    painter.setPen(Qt.GlobalColor.transparent)
-                    painter.drawRect(cell_rect)
+                self._load_changes.touch(max(lo, load.lo), min(hi, load.hi))
+        span = self._changed_span
+        self._changed_span = (lo, hi) if span is None else (min(lo, span[0]), max(hi, span[1]))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self._flush_changes)
+        page_lo, page_hi = self.visible_range()
+        if hi < page_lo or lo > page_hi:
+            return
+        if self._before is None:
+            self._before = (page_lo, self.page_grid())
+        self._grid = None
+        self._dirty_ranges.append((max(lo, page_lo), min(hi, page_hi)))
 
-                # if more than 9 -> badge will be drawn below
-        else:
-            # no projects -> draw nothing special (keeps base background)
-            pass
+    def _flush_changes(self):
+        self._flush_scheduled = False
+        self._patch_load()
+        span, self._changed_span = self._changed_span, None
+        if span is not None:
+            self.projectsChanged.emit(*span)
+        if self._before is None:
+            return
+        page_lo, before = self._before
+        ranges = self._dirty_ranges
+        self._before = None
+        self._dirty_ranges = []
+        lo, hi = self.visible_range()
+        if lo != page_lo or self.display_mode != "projects":
+            # page switched meanwhile (it repaints anyway), or heatmap colours are
+            # relative to the page peak, which any change can move
+            self.viewport().update()
+            return
+        after = self.page_grid()
+        vp = self.viewport()
+        seen = set()
+        for a, b in ranges:
+            for jd in range(a, b + 1):
+                if jd in seen:
+                    continue
+                seen.add(jd)
+                if before.cell(jd - lo) != after.cell(jd - lo):
+                    r = self.cell_rect(jd)
+                    if r is not None:
+                        vp.update(r)
+
+    def eventFilter(self, obj, event):
+        if obj is self._view.viewport():
+            if event.type() == QEvent.Type.Paint:
+                self.cell_cache.check_palette()
+                if self.status.today != QDate.currentDate().toJulianDay():
+                    QTimer.singleShot(0, self.status.refresh)  # missed midnight (suspend)
+                g = self._grid
+                if g is not None and (g.today != self.status.today or g.lo != self.visible_range()[0]):
+                    self._grid = None
+            elif event.type() == QEvent.Type.Resize:
+                self.cell_cache.clear()
+            elif event.type() == QEvent.Type.MouseMove:
+                if self._selection[0] is not None and self._selection[1] is None:
+                    self.set_hover(self.day_at(event.position().toPoint()))
+            elif event.type() == QEvent.Type.Leave:
+                self.set_hover(None)
+        return super().eventFilter(obj, event)
+
+    def page_grid(self):
+        """PageGrid for the visible page (cached until the page, data or day changes)."""
+        if self._grid is None:
+            lo, hi = self.visible_range()
+            self._grid = PageGrid(lo, self.status.today, self.store.query(lo, hi, recurring=True))
+        return self._grid
+
+    def set_display_mode(self, mode):
+        """Show project colours ("projects") or a workload heatmap: concurrent
+        project count ("count") or load weighted by type ("weighted")."""
+        if mode not in self.DISPLAY_MODES:
+            raise ValueError(f"unknown display mode {mode!r}")
+        if mode != self.display_mode:
+            self.display_mode = mode
+            self._drop_load()
+            self.viewport().update()
+
+    def load_profile(self, lo, hi):
+        """LoadProfile covering [lo, hi] and the visible page, weighted as the
+        current mode ("projects" counts); cached, and patched for the records
+        changed since (see LoadProfile.apply)."""
+        self._patch_load()
+        if self._load is None or not self._load.covers(lo, hi):
+            page_lo, page_hi = self.visible_range()
+            lo, hi = min(lo, page_lo), max(hi, page_hi)
+            weights = LOAD_WEIGHTS if self.display_mode == "weighted" else None
+            self._load_changes.reset()  # the new profile already holds this tick's changes
+            self._load_rules = None
+            self._load = LoadProfile(lo, hi, self.store.export_records(lo, hi, recurring=True), weights)
+        return self._load
+
+    def _patch_load(self):
+        if self._load_changes.ranges:
+            self._load.apply(*self._load_changes.diff())
+        if self._load_rules is not None:
+            before, self._load_rules = self._load_rules, None
+            after = {r.rid: r for r in self.store.rules}
+            self._load.apply(self._rule_records(r for rid, r in before.items() if after.get(rid) is not r),
+                             self._rule_records(r for rid, r in after.items() if before.get(rid) is not r))
 
-        # Draw selection highlight (start / end / inrange) if needed
-        # We will let caller/or parent draw selection; but to keep visual, draw a faint outline if date is selected
-        # Parent selection logic will set attribute on widget: self.selected_start/self.selected_end handled externally
+    def _rule_records(self, rules):
+        lo, hi = self._load.lo, self._load.hi
+        return [(p.pid, p.name, p.ptype, p.start, p.end, p.done)
+                for r in rules for p in r.occurrences(lo - r.length + 1, hi)]
 
-        # Draw the day number on top-right-ish
+    def _drop_load(self):
+        self._load = None
+        self._load_changes.reset()
+        self._load_rules = None
+
+    def set_highlight(self, ids):
+        """Outline the cells showing a project in ids (pids, -rid for rules) and
+        dim the others; None shows every cell normally."""
+        self._highlight = ids
+        self._hits = None
+        self.viewport().update()
+
+    def page_hits(self):
+        """Per-cell highlight flags for the visible page, or None without a highlight."""
+        if self._highlight is None:
+            return None
+        g = self.page_grid()
+        if self._hits is None or self._hits[0] is not g:
+            hits = [False] * PageGrid.CELLS
+            for p in self.store.query(g.lo, g.lo + PageGrid.CELLS - 1, recurring=True):
+                if p.pid in self._highlight:
+                    for i in range(max(p.start - g.lo, 0), min(p.end - g.lo, PageGrid.CELLS - 1) + 1):
+                        hits[i] = True
+            self._hits = (g, hits)
+        return self._hits[1]
+
+    def paintCell(self, painter: QPainter, rect: QRect, date: QDate):
+        """Override to paint our multi-project visuals"""
+        g = self.page_grid()
+        i = date.toJulianDay() - g.lo
+        is_today = g.when[i] == 0
+        dpr = self.devicePixelRatioF()
+        if self.display_mode == "projects":
+            projects = g.tids[i]
+            overflow = g.overflow[i]
+            key = (projects, overflow, rect.width(), rect.height(), dpr, is_today)
+        else:
+            prof = self.load_profile(g.lo, g.lo + PageGrid.CELLS - 1)
+            value = prof.load(g.lo + i)
+            level = heat_level(value, prof.peak(g.lo, g.lo + PageGrid.CELLS - 1))
+            label = f"{value:g}" if value else ""
+            key = ("heat", level, label, rect.width(), rect.height(), dpr, is_today)
+        pix = self.cell_cache.get(key)
+        if pix is None:
+            pix = QPixmap(max(1, round(rect.width() * dpr)), max(1, round(rect.height() * dpr)))
+            pix.setDevicePixelRatio(dpr)
+            pix.fill(Qt.GlobalColor.transparent)
+            p = QPainter(pix)
+            if key[0] == "heat":
+                render_heat_cell(p, QRect(0, 0, rect.width(), rect.height()), level, label, is_today)
+            else:
+                render_day_cell(p, QRect(0, 0, rect.width(), rect.height()), projects, is_today, overflow)
+            p.end()
+            self.cell_cache.put(key, pix)
+        painter.drawPixmap(rect.topLeft(), pix)
+
+        # Draw the day number on top-left (the only per-date part of a cell)
+        painter.save()
         painter.setPen(qcolor("#cfe8ff"))
         font = painter.font()
         font.setPointSize(9)
         painter.setFont(font)
-        day_text = str(date.day())
-        # position in top-left with a little padding
-        painter.drawText(rect.adjusted(6, 4, -6, -4), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, day_text)
-
-        # If there are >9 projects, draw +N badge bottom-right
-        if count > 9:
-            extra = count - 9
-            badge_text = f"+{extra}"
-            # badge rect
-            badge_w = 28
-            badge_h = 16
-            bx = rect.right() - badge_w - 6
-            by = rect.bottom() - badge_h - 6
-            badge_rect = QRect(bx, by, badge_w, badge_h)
-            painter.setBrush(qcolor("#0f172a"))
-            painter.setPen(qcolor("#cfe8ff"))
-            painter.drawRoundedRect(badge_rect, 6, 6)
-            font2 = QFont()
-            font2.setPointSize(8)
-            painter.setFont(font2)
-            painter.drawText(badge_rect, Qt.AlignmentFlag.AlignCenter, badge_text)
-
-        # If date is today, draw a subtle outline or mark
-        if date == QDate.currentDate():
-            pen = painter.pen()
-            pen.setColor(qcolor("#38bdf8"))
-            pen.setWidth(1)
-            painter.setPen(pen)
+        painter.drawText(rect.adjusted(6, 4, -6, -4), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, str(date.day()))
+        painter.restore()
+
+        # Search matches: drawn over the cached cell, so the cache is shared with or without a search
+        hits = self.page_hits()
+        if hits is not None:
+            if hits[i]:
+                painter.save()
+                painter.setPen(QPen(qcolor("#facc15"), 2))
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawRoundedRect(rect.adjusted(1, 1, -2, -2), 4, 4)
+                painter.restore()
+            else:
+                painter.fillRect(rect, qcolor("#b40f172a"))  # ARGB: the background, mostly opaque
+
+        # Selection (start / end / in range / hover preview), also over the cached cell
+        role = self.selection_role(self._selection, g.lo + i)
+        if role != self.SEL_NONE:
+            painter.save()
+            if role == self.SEL_END:
+                painter.fillRect(rect, qcolor("#4d60a5fa"))
+                painter.setPen(QPen(qcolor("#60a5fa"), 2))
+            elif role == self.SEL_IN:
+                painter.fillRect(rect, qcolor("#3360a5fa"))
+                painter.setPen(Qt.PenStyle.NoPen)
+            else:
+                painter.fillRect(rect, qcolor("#1f60a5fa"))
+                painter.setPen(QPen(qcolor("#8060a5fa"), 1, Qt.PenStyle.DashLine))
             painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawRect(rect.adjusted(1,1,-1,-1))
+            painter.drawRect(rect.adjusted(1, 1, -2, -2))
+            painter.restore()
 
-        painter.restore()
+# -----------------------
+# Year / multi-month overview: virtualised rows of cached month tiles
+# -----------------------
+class YearOverview(QAbstractScrollArea):
+    """Scrollable grid of month tiles, 1-6 months per row depending on width
+    (rows always start in January, so a row is a year, half, quarter...).
+
+    Only rows in view are painted. Each month is rendered once into a pixmap
+    tile (colour rules from render_day_cell) kept in a CellPixmapCache; tile keys
+    carry a per-month generation that store/status listeners bump for months
+    touched by a change, so only those tiles are rendered again. Uncached tiles
+    are rendered within a per-frame time budget and the rest follow on the next
+    frame, so fast scrolling over dense data keeps up with the display.
+    """
+    monthActivated = pyqtSignal(int, int)  # year, month
+
+    MIN_TILE_W = 120
+    TITLE_H = 16
+    MARGIN = 4
+    YEARS_AROUND = 50       # scrollable span around the current year
+    FRAME_BUDGET_MS = 6     # time for rendering new tiles per paint
+
+    def __init__(self, calendar, parent=None):
+        super().__init__(parent)
+        self.calendar = calendar
+        self.tiles = CellPixmapCache(max_bytes=32 * 1024 * 1024)
+        self._gen = {}           # month index -> generation
+        self._store = None
+        self._status = calendar.status
+        self._status.add_listener(self._on_changing)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(24)
+        self._bind_store()
+        self._layout()
+        self.scroll_to_month(QDate.currentDate().year(), 1)
+
+    # month index: year * 12 + month - 1
+    def _first_index(self):
+        return (QDate.currentDate().year() - self.YEARS_AROUND) * 12
+
+    def _bind_store(self):
+        # follow CustomCalendar.set_store / set_database
+        store = self.calendar.store
+        if store is self._store:
+            return
+        if self._store is not None:
+            self._store.remove_listener(self._on_changing)
+        store.add_listener(self._on_changing)
+        self._store = store
+        self._gen.clear()
+        self.tiles.clear()
+
+    def _on_changing(self, lo, hi):
+        a = jd_to_qdate(lo); b = jd_to_qdate(hi)
+        first = a.year() * 12 + a.month() - 1
+        last = b.year() * 12 + b.month() - 1
+        if last - first > 240:
+            self._gen.clear()  # bulk change: invalidate everything at once
+            self.tiles.clear()
+        else:
+            for m in range(first, last + 1):
+                self._gen[m] = self._gen.get(m, 0) + 1
+        self.viewport().update()
+
+    def _layout(self):
+        w = self.viewport().width()
+        self.columns = next((c for c in (6, 4, 3, 2) if w // c >= self.MIN_TILE_W), 1)
+        self.tile_w = w // self.columns
+        self.cell_w = max(4, (self.tile_w - 2 * self.MARGIN) // 7)
+        self.cell_h = max(4, self.cell_w * 4 // 5)
+        self.tile_h = self.TITLE_H + 6 * self.cell_h + 2 * self.MARGIN
+        rows = 2 * self.YEARS_AROUND * 12 // self.columns + 12 // self.columns
+        sb = self.verticalScrollBar()
+        sb.setPageStep(self.viewport().height())
+        sb.setRange(0, max(0, rows * self.tile_h - self.viewport().height()))
+
+    def scroll_to_month(self, year, month):
+        row = (year * 12 + month - 1 - self._first_index()) // self.columns
+        self.verticalScrollBar().setValue(row * self.tile_h)
+
+    def top_month(self):
+        idx = self._first_index() + self.verticalScrollBar().value() // self.tile_h * self.columns
+        return idx // 12, idx % 12 + 1
+
+    def resizeEvent(self, event):
+        year, month = self.top_month()
+        super().resizeEvent(event)
+        self._layout()
+        self.tiles.clear()
+        self.scroll_to_month(year, month)
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def month_at(self, pos):
+        row = (self.verticalScrollBar().value() + pos.y()) // self.tile_h
+        col = pos.x() // self.tile_w
+        if col >= self.columns:
+            return None
+        idx = self._first_index() + row * self.columns + col
+        return idx // 12, idx % 12 + 1
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            ym = self.month_at(event.position().toPoint())
+            if ym is not None:
+                self.monthActivated.emit(*ym)
+        super().mouseReleaseEvent(event)
+
+    def paintEvent(self, event):
+        self._bind_store()
+        self.tiles.check_palette()
+        p = QPainter(self.viewport())
+        p.fillRect(event.rect(), qcolor("#0f172a"))
+        top = self.verticalScrollBar().value()
+        first_row = top // self.tile_h
+        last_row = (top + self.viewport().height()) // self.tile_h
+        dpr = self.devicePixelRatioF()
+        deadline = time.perf_counter() + self.FRAME_BUDGET_MS / 1000
+        missing = False
+        for row in range(first_row, last_row + 1):
+            for col in range(self.columns):
+                idx = self._first_index() + row * self.columns + col
+                key = (idx, self._gen.get(idx, 0), self.tile_w, self.tile_h, dpr)
+                pix = self.tiles.get(key)
+                if pix is None:
+                    if time.perf_counter() > deadline:
+                        missing = True
+                        continue  # background only; filled in on the next frame
+                    pix = self._render_tile(idx, dpr)
+                    self.tiles.put(key, pix)
+                p.drawPixmap(col * self.tile_w, row * self.tile_h - top, pix)
+        p.end()
+        if missing:
+            QTimer.singleShot(0, self.viewport().update)
+
+    def _render_tile(self, idx, dpr):
+        year, month = divmod(idx, 12)
+        first = QDate(year, month + 1, 1)
+        offset = (first.dayOfWeek() - self.calendar.firstDayOfWeek().value) % 7
+        lo = first.toJulianDay() - offset
+        m_lo, m_hi = first.toJulianDay(), first.addMonths(1).toJulianDay() - 1
+        # export_records rather than query: a database-backed store answers from
+        # the database without moving the window the month view has loaded
+        projects = [Project(*r) for r in self._store.export_records(m_lo, m_hi, recurring=True)]
+        g = PageGrid(lo, self._status.today, projects)
+        pix = QPixmap(max(1, round(self.tile_w * dpr)), max(1, round(self.tile_h * dpr)))
+        pix.setDevicePixelRatio(dpr)
+        pix.fill(qcolor("#0f172a"))
+        p = QPainter(pix)
+        p.setPen(qcolor("#cfe8ff"))
+        font = p.font()
+        font.setPixelSize(self.TITLE_H - 4)
+        p.setFont(font)
+        p.drawText(QRect(self.MARGIN, 0, self.tile_w - 2 * self.MARGIN, self.TITLE_H),
+                   Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, first.toString("MMMM yyyy"))
+        for i in range(m_lo - lo, m_hi - lo + 1):
+            row, col = divmod(i, 7)
+            rect = QRect(self.MARGIN + col * self.cell_w, self.TITLE_H + self.MARGIN + row * self.cell_h,
+                         self.cell_w, self.cell_h)
+            p.fillRect(rect, qcolor("#1e293b"))  # shows as 1px grid lines between days
+            render_day_cell(p, rect.adjusted(0, 0, -1, -1), g.tids[i], g.when[i] == 0, g.overflow[i])
+        p.end()
+        return pix
+
+# -----------------------
+# Day detail panel: one day's projects in a lazily fetched list model
+# -----------------------
+class DayProjectsModel(QAbstractListModel):
+    """The projects (and rule occurrences) on one day, for a QListView.
+
+    The view is handed FETCH rows at a time through canFetchMore() /
+    fetchMore() as it scrolls, and row text and swatches are built in data()
+    only for the rows it paints, so a day with thousands of projects opens as
+    fast as one with ten. Like the calendar, the model listens to the store:
+    a change touching the day is diffed at the end of the tick and reported as
+    row removals, dataChanged and appended rows instead of a reset.
+    """
+    changed = pyqtSignal()  # day or row count changed
+    FETCH = 200
+    RecordRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, calendar, parent=None):
+        super().__init__(parent)
+        self.calendar = calendar
+        self.day = None
+        self._rows = []         # export_records() tuples, in display order
+        self._shown = 0         # rows the view has fetched
+        self._store = None
+        self._scheduled = False
+        self._restatus = False
+        self._swatches = {}     # colour -> QPixmap
+        calendar.status.add_listener(self._on_status_changing)
+
+    @staticmethod
+    def _key(r):
+        # rule occurrences share pid -rid; a long one can overlap the next
+        return r[0] if r[0] > 0 else (r[0], r[3])
+
+    def _bind_store(self):
+        # follow CustomCalendar.set_store / set_database
+        store = self.calendar.store
+        if store is not self._store:
+            if self._store is not None:
+                self._store.remove_listener(self._on_changing)
+            store.add_listener(self._on_changing)
+            self._store = store
+
+    def set_day(self, day):
+        self._bind_store()
+        self.beginResetModel()
+        self.day = day
+        self._rows = [] if day is None else self._store.export_records(day, day, recurring=True)
+        self._shown = min(len(self._rows), self.FETCH)
+        self.endResetModel()
+        self.changed.emit()
+
+    def total(self):
+        """Projects on the day, fetched by the view or not."""
+        return len(self._rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._shown
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._shown < len(self._rows)
+
+    def fetchMore(self, parent):
+        n = min(self.FETCH, len(self._rows) - self._shown)
+        if n > 0:
+            self.beginInsertRows(QModelIndex(), self._shown, self._shown + n - 1)
+            self._shown += n
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._shown:
+            return None
+        r = self._rows[index.row()]
+        pid, name, ptype, start, end, done = r
+        if role == self.RecordRole:
+            return r
+        status = project_status(ptype, end, self.calendar.status.today, done)
+        if role == Qt.ItemDataRole.DisplayRole:
+            label = name if ptype == name else f"{name} ({ptype})"
+            span = jd_to_iso(start) if start == end else f"{jd_to_iso(start)} → {jd_to_iso(end)}"
+            return f"{label}\n{span} · {status}"
+        if role == Qt.ItemDataRole.DecorationRole:
+            # the colour the calendar paints it in (derived status first)
+            tid = _STATUS_TIDS.get(status)
+            color = type_color(tid) if tid is not None else PALETTE.get(ptype, PALETTE["Extra"])
+            pix = self._swatches.get(color)
+            if pix is None:
+                pix = self._swatches[color] = color_swatch_pix(color, size=12)
+            return pix
+        return None
+
+    def _on_changing(self, lo, hi):
+        if self.day is not None and lo <= self.day <= hi and not self._store.reloading:
+            self._schedule()
+
+    def _on_status_changing(self, lo, hi):
+        if self.day is not None and lo <= self.day <= hi:
+            self._restatus = True
+            self._schedule()
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self._apply_changes)
+
+    def _apply_changes(self):
+        self._scheduled = False
+        if self.day is None:
+            return
+        key = self._key
+        new = {key(r): r for r in self._store.export_records(self.day, self.day, recurring=True)}
+        # removals, as runs taken from the back so earlier row numbers stay valid
+        row = len(self._rows) - 1
+        while row >= 0:
+            if key(self._rows[row]) in new:
+                row -= 1
+                continue
+            last = row
+            while row > 0 and key(self._rows[row - 1]) not in new:
+                row -= 1
+            self._remove(row, last)
+            row -= 1
+        for row, r in enumerate(self._rows):
+            r2 = new[key(r)]
+            if r2 != r:
+                self._rows[row] = r2
+                if row < self._shown and not self._restatus:
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index)
+        if self._restatus and self._shown:
+            self.dataChanged.emit(self.index(0), self.index(self._shown - 1))
+        self._restatus = False
+        known = {key(r) for r in self._rows}
+        added = [r for k, r in new.items() if k not in known]
+        if added:
+            first = len(self._rows)
+            self._rows.extend(added)
+            if self._shown == first:  # otherwise they come with the next fetchMore()
+                n = min(len(added), self.FETCH)
+                self.beginInsertRows(QModelIndex(), first, first + n - 1)
+                self._shown += n
+                self.endInsertRows()
+        self.changed.emit()
+
+    def _remove(self, first, last):
+        if first < self._shown:
+            end = min(last, self._shown - 1)
+            self.beginRemoveRows(QModelIndex(), first, end)
+            del self._rows[first:last + 1]
+            self._shown -= end - first + 1
+            self.endRemoveRows()
+        else:
+            del self._rows[first:last + 1]
+
+
+class DayDetailPanel(QWidget):
+    """Non-modal list of the projects on a day (name, colour, range, status),
+    docked under the calendar."""
+    closed = pyqtSignal()
+
+    def __init__(self, calendar, parent=None):
+        super().__init__(parent)
+        self.model = DayProjectsModel(calendar, self)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(6, 0, 6, 0)
+        layout.setSpacing(4)
+        self.setLayout(layout)
+        header = QHBoxLayout()
+        self.lbl_day = QLabel("")
+        self.btn_close = QPushButton("✕")
+        self.btn_close.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.btn_close.setFixedHeight(24)
+        header.addWidget(self.lbl_day)
+        header.addStretch()
+        header.addWidget(self.btn_close)
+        layout.addLayout(header)
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setUniformItemSizes(True)  # rows are never measured one by one
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        layout.addWidget(self.view)
+        self.setFixedHeight(160)
+        self.model.changed.connect(self._update_title)
+        self.btn_close.clicked.connect(self.closed)
+
+    def show_day(self, day):
+        self.model.set_day(day)
+        self.view.scrollToTop()
+
+    def _update_title(self):
+        n = self.model.total()
+        day = jd_to_iso(self.model.day) if self.model.day is not None else ""
+        self.lbl_day.setText(f"{day} · {n:,} project{'' if n == 1 else 's'}" if n else f"{day} · no projects")
+
+# -----------------------
+# Startup timing (--startup-profile)
+# -----------------------
+class StartupProfile:
+    """Wall-clock time per startup phase, printed once the deferred init is done."""
+
+    def __init__(self, t0=None):
+        self.t0 = self.last = t0 if t0 is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, name, now=None):
+        now = time.perf_counter() if now is None else now
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        print("startup profile (ms):", file=stream)
+        for name, dt in self.phases:
+            print(f"  {name:<36}{dt * 1000:9.1f}", file=stream)
+        print(f"  {'total':<36}{(self.last - self.t0) * 1000:9.1f}", file=stream)
+
+# -----------------------
+# Opt-in runtime profiling (FLOATING_CALENDAR_PROFILE=<dump.json>, or 1)
+# -----------------------
+# Nothing below runs unless the variable is set: the hooks are installed by
+# wrapping methods in enable_profiling(), so the normal build pays nothing.
+PROFILE_ENV = "FLOATING_CALENDAR_PROFILE"
+PROFILE_DEFAULT_PATH = "floating_calendar_profile.json"
+PROFILER = None  # the active Profiler, if any
+
+class Histogram:
+    """Durations in log2 buckets: bucket i counts samples below 2**i microseconds."""
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * 32
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), 31)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound (ms) of the bucket holding the q-th percentile."""
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return (1 << i) / 1000
+        return 0.0
+
+    def to_dict(self):
+        return {"count": self.count,
+                "mean_ms": round(self.total * 1000 / self.count, 4) if self.count else 0.0,
+                "max_ms": round(self.max * 1000, 4),
+                "p50_ms": self.percentile(50), "p95_ms": self.percentile(95), "p99_ms": self.percentile(99),
+                "buckets_us": {f"<{1 << i}": n for i, n in enumerate(self.buckets) if n}}
+
+
+class ProfilingApplication(QApplication):
+    """QApplication whose notify() times whole paint events of registered widgets
+    (filters see a paint before it happens; notify returns after it)."""
+    profiler = None
+
+    def notify(self, receiver, event):
+        prof = self.profiler
+        if prof is None or event.type() != QEvent.Type.Paint or receiver not in prof.paint_targets:
+            return super().notify(receiver, event)
+        t0 = time.perf_counter()
+        try:
+            return super().notify(receiver, event)
+        finally:
+            prof.frame(prof.paint_targets[receiver], time.perf_counter() - t0)
+
+
+class Profiler(QObject):
+    """Timing histograms, an event-loop stall detector, periodic JSON dumps and
+    a last-frame-time overlay. Created by enable_profiling()."""
+
+    TICK_MS = 50  # stall detector period
+
+    def __init__(self, path, dump_interval_ms=10000, stall_ms=100, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.stall_ms = stall_ms
+        self.t0 = time.perf_counter()
+        self.hists = {}
+        self.paint_targets = {}  # widget -> histogram name, timed by ProfilingApplication
+        self.last_frame_ms = 0.0
+        self.stalls = deque(maxlen=20)  # (seconds since start, ms late)
+        self._overlay = None
+        self._last_tick = time.perf_counter()
+        self._tick_timer = QTimer(self)
+        self._tick_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._tick_timer.timeout.connect(self._tick)
+        self._tick_timer.start(self.TICK_MS)
+        self._dump_timer = QTimer(self)
+        self._dump_timer.timeout.connect(self.dump)
+        self._dump_timer.start(dump_interval_ms)
+
+    def record(self, name, seconds):
+        h = self.hists.get(name)
+        if h is None:
+            h = self.hists[name] = Histogram()
+        h.add(seconds)
+
+    def frame(self, name, seconds):
+        self.record(name, seconds)
+        self.last_frame_ms = seconds * 1000
+
+    def wrap(self, cls, attr, name=None):
+        """Replace cls.attr by a version that records its duration under name."""
+        fn = getattr(cls, attr)
+        name = name or attr
+        record = self.record
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        timed.__wrapped__ = fn
+        setattr(cls, attr, timed)
+
+    def _tick(self):
+        now = time.perf_counter()
+        late = (now - self._last_tick) * 1000 - self.TICK_MS
+        self._last_tick = now
+        if late > self.stall_ms:
+            self.record("event_loop.stall", late / 1000)
+            self.stalls.append((round(now - self.t0, 3), round(late, 1)))
+        if self._overlay is not None:
+            self._update_overlay()
+
+    def attach(self, win):
+        """Time win's calendar viewport paints and show the overlay."""
+        self.paint_targets[win.calendar.viewport()] = "viewport.paint"
+        lbl = QLabel(win)
+        lbl.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        lbl.setStyleSheet("background: rgba(15,23,42,0.8); color: #94a3b8; font-size: 9px; padding: 1px 4px;")
+        self._overlay = (win, lbl)
+        self._update_overlay()
+        lbl.show()
+
+    def _update_overlay(self):
+        win, lbl = self._overlay
+        lbl.setText(f"frame {self.last_frame_ms:.1f} ms")
+        lbl.adjustSize()
+        g = win.calendar.geometry()
+        lbl.move(g.right() - lbl.width() - 4, g.bottom() - lbl.height() - 4)
+        lbl.raise_()
+
+    def snapshot(self):
+        return {"pid": os.getpid(), "uptime_s": round(time.perf_counter() - self.t0, 3),
+                "last_frame_ms": round(self.last_frame_ms, 4),
+                "histograms": {k: h.to_dict() for k, h in sorted(self.hists.items())},
+                "stalls": {"threshold_ms": self.stall_ms, "recent": list(self.stalls)}}
+
+    def dump(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp, self.path)  # readers never see a half-written file
+
+
+def _timed_drag_filter(fn):
+    # only the header drag path of FloatingCalendar.eventFilter is of interest
+    def eventFilter(self, obj, event):
+        if not (self._drag_active and event.type() == QEvent.Type.MouseMove and obj is self.header_widget):
+            return fn(self, obj, event)
+        t0 = time.perf_counter()
+        try:
+            return fn(self, obj, event)
+        finally:
+            PROFILER.record("eventFilter.drag", time.perf_counter() - t0)
+    eventFilter.__wrapped__ = fn
+    return eventFilter
+
+
+def enable_profiling(path=None, dump_interval_ms=10000, stall_ms=100):
+    """Install the profiling hooks; call after the QApplication exists and before
+    windows are created. Returns the Profiler."""
+    global PROFILER
+    if PROFILER is not None:
+        return PROFILER
+    PROFILER = Profiler(path or PROFILE_DEFAULT_PATH, dump_interval_ms, stall_ms)
+    PROFILER.wrap(CustomCalendar, "paintCell")
+    PROFILER.wrap(CustomCalendar, "set_project_map")
+    PROFILER.wrap(FloatingCalendar, "_on_date_clicked")
+    FloatingCalendar.eventFilter = _timed_drag_filter(FloatingCalendar.eventFilter)
+    app = QApplication.instance()
+    if isinstance(app, ProfilingApplication):
+        app.profiler = PROFILER
+    app.aboutToQuit.connect(PROFILER.dump)
+    return PROFILER
+
+# -----------------------
+# Screen geometry cache: area and frame interval of every screen
+# -----------------------
+class ScreenGeometryCache(QObject):
+    """Geometry, available geometry and frame interval of each screen.
+
+    Read once and refreshed from QGuiApplication screenAdded / screenRemoved /
+    primaryScreenChanged and each screen's geometry and refresh rate signals,
+    so dragging, snapping and placing windows never ask the platform. Lookups
+    pick the screen showing most of a rect (the nearest one if none does),
+    which is what multi-monitor setups need instead of the primary screen.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._screens = []   # (QScreen, geometry, available geometry, frame ms), primary first
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self._on_screen_added)
+        app.screenRemoved.connect(self.refresh)
+        app.primaryScreenChanged.connect(self.refresh)
+        for screen in app.screens():
+            self._watch(screen)
+        self.refresh()
+
+    def _watch(self, screen):
+        screen.geometryChanged.connect(self.refresh)
+        screen.availableGeometryChanged.connect(self.refresh)
+        screen.refreshRateChanged.connect(self.refresh)
+
+    def _on_screen_added(self, screen):
+        self._watch(screen)
+        self.refresh()
+
+    def refresh(self, *_):
+        primary = QGuiApplication.primaryScreen()
+        screens = sorted(QGuiApplication.screens(), key=lambda s: s is not primary)
+        self._screens = [(s, s.geometry(), s.availableGeometry(),
+                          1000.0 / s.refreshRate() if s.refreshRate() > 0 else 1000.0 / 60)
+                         for s in screens]
+
+    def _entry(self, rect=None):
+        if not self._screens:
+            self.refresh()
+        if rect is None:
+            return self._screens[0]
+        best, best_area = None, 0
+        for e in self._screens:
+            r = e[1].intersected(rect)
+            area = 0 if r.isEmpty() else r.width() * r.height()
+            if area > best_area:
+                best, best_area = e, area
+        if best is None:
+            c = rect.center()
+            best = min(self._screens, key=lambda e: max(e[1].left() - c.x(), 0, c.x() - e[1].right())
+                       + max(e[1].top() - c.y(), 0, c.y() - e[1].bottom()))
+        return best
+
+    def available(self, rect=None):
+        """Available geometry of the screen showing most of rect (the primary one for None)."""
+        return self._entry(rect)[2]
+
+    def frame_ms(self, rect=None):
+        """Display frame interval of that screen, in milliseconds."""
+        return self._entry(rect)[3]
+
+    def shows(self, rect):
+        """Whether any screen shows part of rect (False after its monitor was unplugged)."""
+        return any(e[1].intersects(rect) for e in self._screens)
 
 # -----------------------
 # Main Floating Calendar (keeps prior functionality)
@@ -172,8 +4317,9 @@ class CustomCalendar(QCalendarWidget):
 class FloatingCalendar(QWidget):
     SNAP_MARGIN = 24  # snapping threshold
 
-    def __init__(self):
+    def __init__(self, db_path=None, profile=None, journal_path=None):
         super().__init__()
+        self._profile = profile
         self.setWindowTitle("Floating Calendar")
         # Always on top and frameless
         self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, True)
@@ -181,7 +4327,15 @@ class FloatingCalendar(QWidget):
         self.setWindowOpacity(0.96)  # Option A
         self._drag_active = False
         self._drag_pos = QPoint(0,0)
+        # drag moves are coalesced to one per display frame (see _schedule_drag_move)
+        self._drag_target = None
+        self._drag_moved_at = 0.0
+        self._drag_timer = QTimer(self)
+        self._drag_timer.setSingleShot(True)
+        self._drag_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._drag_timer.timeout.connect(self._apply_drag_move)
         self._last_geom = None
+        self.screens = ScreenGeometryCache(self)
 
         self.start_date = None
         self.end_date = None
@@ -189,9 +4343,23 @@ class FloatingCalendar(QWidget):
         # Tray
         self.tray = None
         self.always_on_top = True
+        self.db = None
+        self.journal = None     # ProjectJournal when saving to a journal directory
+        self._export_job = None
+        self._copy_pending = None  # remaining parts of a chunked copy
+        self._import_job = None
+        # tray icon, mini bar and legend swatches are created after the first frame
+        self._mini_bar = None
+        self._overview = None   # YearOverview, built on first use
+        self._detail = None     # DayDetailPanel, built on the first click on a busy day
+        self._sync = None       # ScheduleSync, see watch_schedule()
+        self._control = None    # ControlServer, see serve_ipc()
+        self._startup_done = False
 
         self._build_ui()
+        self._mark("_build_ui")
         self._apply_styles()
+        self._mark("_apply_styles")
         self._connect_signals()
 
         # sample project_map to demo (today with multiple)
@@ -201,13 +4369,78 @@ class FloatingCalendar(QWidget):
             QDate.currentDate().addDays(2).toString("yyyy-MM-dd"): ["Installation","Completed","Delay","Handover","Extra","Inspection"],
             QDate.currentDate().addDays(5).toString("yyyy-MM-dd"): ["Fabrication","Installation","Completed","Overdue","Delay","Inspection","Handover","Extra","Tentative","Extra"],
         }
-        # apply demo
-        self.calendar.set_project_map(demo_map)
+        if journal_path:
+            # all projects in memory, saved as an append-only journal plus snapshots
+            self.journal = ProjectJournal(journal_path)
+            self.calendar.set_store(JournalProjectStore(self.journal))
+        elif db_path:
+            # persistent projects; only the visible month (+ prefetch) is read
+            self.db = ProjectDatabase(db_path)
+            self.calendar.set_database(self.db)
+        else:
+            # apply demo
+            self.calendar.set_project_map(demo_map)
+            self.calendar.history.commit()
+            self.calendar.history.clear()  # loading the demo is not an undoable edit
+        self._mark("load projects")
 
-        # position and tray
-        screen_geo = QApplication.primaryScreen().availableGeometry()
+        # position; the tray follows once the calendar is on screen
+        screen_geo = self.screens.available()
         self.move(screen_geo.right() - self.width() - 24, screen_geo.bottom() - self.height() - 24)
+        self.calendar.viewport().installEventFilter(self)
+        QTimer.singleShot(1000, self._finish_startup)  # in case nothing is ever painted
+
+    def _mark(self, phase):
+        if self._profile is not None:
+            self._profile.mark(phase)
+
+    def _finish_startup(self):
+        """Deferred part of startup: legend swatches, mini bar and tray icon."""
+        if self._startup_done:
+            return
+        self._startup_done = True
+        self.calendar.viewport().removeEventFilter(self)
+        for lbl, key in self._legend_labels:
+            lbl.setPixmap(color_swatch_pix(PALETTE.get(key, PALETTE["Extra"]), size=12))
+        self.mini_bar  # build it now rather than on the first minimise
         self._create_tray_icon()
+        if PROFILER is not None:
+            PROFILER.attach(self)
+        self._mark("deferred init (tray, bar, legend)")
+        if self._profile is not None:
+            self._profile.report()
+
+    @property
+    def mini_bar(self):
+        if self._mini_bar is None:
+            self._mini_bar = MiniBar(self)
+        return self._mini_bar
+
+    @property
+    def overview(self):
+        if self._overview is None:
+            self._overview = YearOverview(self.calendar)
+            self._overview.hide()
+            self._overview.monthActivated.connect(self._open_month)
+            self.layout().insertWidget(self.layout().indexOf(self.calendar) + 1, self._overview)
+        return self._overview
+
+    def _toggle_overview(self):
+        """Switch between the month view and the year overview."""
+        if self._overview is not None and self._overview.isVisible():
+            self._overview.hide()
+            self.calendar.show()
+            self.btn_year.setText("Year")
+        else:
+            self.overview.resize(self.calendar.size())
+            self.calendar.hide()
+            self.overview.show()
+            self.overview.scroll_to_month(self.calendar.yearShown(), 1)
+            self.btn_year.setText("Month")
+
+    def _open_month(self, year, month):
+        self.calendar.setCurrentPage(year, month)
+        self._toggle_overview()
 
     def _build_ui(self):
         root = QVBoxLayout()
@@ -230,19 +4463,47 @@ class FloatingCalendar(QWidget):
         self.btn_today = QPushButton("Today")
         self.btn_week = QPushButton("This Week")
         self.btn_month = QPushButton("This Month")
+        self.btn_year = QPushButton("Year")
+        self.btn_find = QPushButton("Find")
         self.btn_min = QPushButton("—")
         self.btn_close = QPushButton("✕")
-        for b in (self.btn_today, self.btn_week, self.btn_month, self.btn_min, self.btn_close):
+        for b in (self.btn_today, self.btn_week, self.btn_month, self.btn_year, self.btn_find, self.btn_min,
+                  self.btn_close):
             b.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
             b.setFixedHeight(28)
 
         header_layout.addWidget(self.btn_today)
         header_layout.addWidget(self.btn_week)
         header_layout.addWidget(self.btn_month)
+        header_layout.addWidget(self.btn_year)
+        header_layout.addWidget(self.btn_find)
         header_layout.addWidget(self.btn_min)
         header_layout.addWidget(self.btn_close)
         root.addWidget(self.header_widget)
 
+        # Search bar (Find / Ctrl+F): filters by project name or type
+        self.search_bar = QWidget()
+        search_layout = QHBoxLayout()
+        search_layout.setContentsMargins(6,0,6,0)
+        search_layout.setSpacing(6)
+        self.search_bar.setLayout(search_layout)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search name or type…")
+        self.search_edit.setClearButtonEnabled(True)
+        self.lbl_matches = QLabel("")
+        self.btn_prev_match = QPushButton("◀")
+        self.btn_next_match = QPushButton("▶")
+        for b in (self.btn_prev_match, self.btn_next_match):
+            b.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+            b.setFixedHeight(28)
+        search_layout.addWidget(self.search_edit)
+        search_layout.addWidget(self.lbl_matches)
+        search_layout.addWidget(self.btn_prev_match)
+        search_layout.addWidget(self.btn_next_match)
+        self.search_bar.hide()
+        self._match = None  # SearchMatch of the current search text
+        root.addWidget(self.search_bar)
+
         # Custom calendar
         self.calendar = CustomCalendar()
         root.addWidget(self.calendar)
@@ -250,34 +4511,47 @@ class FloatingCalendar(QWidget):
         # Footer: info + legend + actions
         footer = QHBoxLayout()
         self.lbl_info = QLabel("No dates selected")
-        footer.addWidget(self.lbl_info)
+        # wraps inside a fixed two-line box: selection text never resizes the
+        # window (which would repaint the whole calendar)
+        self.lbl_info.setWordWrap(True)
+        self.lbl_info.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        self.lbl_info.setMinimumWidth(self.lbl_info.fontMetrics().horizontalAdvance("Range: 0000-00-00 → 0000-00-00") + 8)
+        self.lbl_info.setFixedHeight(2 * self.lbl_info.fontMetrics().lineSpacing() + 2)
+        footer.addWidget(self.lbl_info, 2)
         footer.addStretch()
 
         # Legend small subset
         legend_layout = QHBoxLayout()
         legend_layout.setSpacing(6)
         items = [("Fabrication","Fabrication"),("Overdue","Overdue"),("Completed","Completed"),("Inspection","Inspection")]
+        self._legend_labels = []
         for label_text, key in items:
-            lbl = QLabel(label_text)
-            lbl.setPixmap(color_swatch_pix(PALETTE.get(key, PALETTE["Extra"]), size=12))
+            lbl = QLabel()
+            lbl.setToolTip(label_text)
             lbl.setContentsMargins(6,0,6,0)
+            lbl.setMinimumSize(24, 12)  # swatch pixmap is set after the first frame
             lbl.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
             legend_layout.addWidget(lbl)
+            self._legend_labels.append((lbl, key))
         footer.addLayout(legend_layout)
 
         footer.addStretch()
+        self.btn_done = QPushButton("Done")
         self.btn_copy = QPushButton("Copy")
         self.btn_export = QPushButton("Export (CSV)")
-        for b in (self.btn_copy, self.btn_export):
+        self.btn_import = QPushButton("Import")
+        self.btn_load = QPushButton("Load")
+        self.btn_load.setToolTip("Workload heatmap: off / project count / weighted by type (H)")
+        for b in (self.btn_done, self.btn_copy, self.btn_export, self.btn_import, self.btn_load):
             b.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
             b.setFixedHeight(30)
+        footer.addWidget(self.btn_done)
         footer.addWidget(self.btn_copy)
         footer.addWidget(self.btn_export)
+        footer.addWidget(self.btn_import)
+        footer.addWidget(self.btn_load)
         root.addLayout(footer)
 
-        # Mini bar
-        self.mini_bar = MiniBar(self)
-
         # Dragging via header event filter
         self.header_widget.installEventFilter(self)
 
@@ -302,6 +4576,13 @@ class FloatingCalendar(QWidget):
         }
         QPushButton:hover { background: rgba(255,255,255,0.04); color: #60a5fa; }
         QLabel { color: #cfe8ff; }
+        QLineEdit {
+            background: rgba(255,255,255,0.04);
+            border: 0;
+            padding: 4px 8px;
+            border-radius: 8px;
+            color: #e6eef8;
+        }
         """
         self.setStyleSheet(style)
         self.resize(380, 460)
@@ -310,13 +4591,29 @@ class FloatingCalendar(QWidget):
         self.btn_today.clicked.connect(self._go_today)
         self.btn_week.clicked.connect(self._go_week)
         self.btn_month.clicked.connect(self._go_month)
+        self.btn_year.clicked.connect(self._toggle_overview)
+        self.btn_find.clicked.connect(lambda: self._toggle_search())
+        self.search_edit.textChanged.connect(self._run_search)
+        self.search_edit.returnPressed.connect(lambda: self._step_match(1))
+        self.btn_next_match.clicked.connect(lambda: self._step_match(1))
+        self.btn_prev_match.clicked.connect(lambda: self._step_match(-1))
+        self.calendar.search.changed.connect(self._run_search)  # store edits while searching
+        self.calendar.projectsChanged.connect(self._on_projects_changed)  # range load after edits
         self.btn_min.clicked.connect(self._minimize_to_bar)
         self.btn_close.clicked.connect(self._close_app)
+        self.btn_done.clicked.connect(self._toggle_done_selection)
         self.btn_copy.clicked.connect(self._copy_selection)
-        self.btn_export.clicked.connect(self._export_csv)
+        self.btn_export.clicked.connect(lambda: self._export_csv())
+        self.btn_import.clicked.connect(lambda: self._import_schedule())
+        self.btn_load.clicked.connect(self._cycle_heatmap)
 
     # Dragging via header eventFilter
     def eventFilter(self, obj, event):
+        if not self._startup_done and event.type() == QEvent.Type.Paint and obj is self.calendar.viewport():
+            # let this first frame finish, then do the rest of startup
+            self._mark("first paint")
+            QTimer.singleShot(0, self._finish_startup)
+            return False
         if obj is self.header_widget:
             if event.type() == QEvent.Type.MouseButtonPress:
                 me = event
@@ -327,19 +4624,39 @@ class FloatingCalendar(QWidget):
                     return True
             elif event.type() == QEvent.Type.MouseMove:
                 if self._drag_active:
-                    gp = event.globalPosition().toPoint()
-                    self.move(gp - self._drag_pos)
+                    self._drag_target = event.globalPosition().toPoint() - self._drag_pos
+                    self._schedule_drag_move()
                     return True
             elif event.type() == QEvent.Type.MouseButtonRelease:
                 if self._drag_active:
                     self._drag_active = False
+                    self._drag_timer.stop()
+                    self._apply_drag_move()  # land where the button was released
                     self.setCursor(Qt.CursorShape.ArrowCursor)
                     self._snap_to_edge_if_close()
                     return True
         return super().eventFilter(obj, event)
 
+    def _schedule_drag_move(self):
+        """Move to _drag_target at most once per display frame: high polling
+        rate mice report far more often than the screen can show a move."""
+        if self._drag_timer.isActive():
+            return  # the pending move picks up the latest target
+        wait = self.screens.frame_ms(self.frameGeometry()) - (time.perf_counter() - self._drag_moved_at) * 1000
+        if wait <= 0:
+            self._apply_drag_move()
+        else:
+            self._drag_timer.start(max(1, round(wait)))
+
+    def _apply_drag_move(self):
+        if self._drag_target is not None:
+            self.move(self._drag_target)
+            self._drag_target = None
+            self._drag_moved_at = time.perf_counter()
+
     def _snap_to_edge_if_close(self):
-        screen_geo = QApplication.primaryScreen().availableGeometry()
+        # the screen the window is (mostly) on, not necessarily the primary one
+        screen_geo = self.screens.available(self.frameGeometry())
         g = self.geometry()
         left = g.left(); right = g.right(); top = g.top(); bottom = g.bottom()
         moved = False
@@ -374,20 +4691,86 @@ class FloatingCalendar(QWidget):
             self.start_date = QDate(qdate)
             self.end_date = None
 
-        # update info label
+        self._on_selection_changed()
+
+        # list the day's projects in the detail panel: a day with projects opens
+        # it, and while it is open it follows every click
+        jd = qdate.toJulianDay()
+        if self._detail is not None and self._detail.isVisible():
+            self._detail.show_day(jd)
+        elif self.calendar.store.query(jd, jd, recurring=True):
+            self._show_detail(jd)
+
+    def _show_detail(self, day):
+        if self._detail is None:
+            self._detail = DayDetailPanel(self.calendar)
+            self._detail.hide()
+            self._detail.closed.connect(self._hide_detail)
+            self.layout().insertWidget(self.layout().indexOf(self.calendar) + 1, self._detail)
+        self._detail.show_day(day)
+        if not self._detail.isVisible():
+            # grow the window rather than squeeze the calendar
+            self._detail.show()
+            self.resize(self.width(), self.height() + self._detail.height() + self.layout().spacing())
+
+    def _hide_detail(self):
+        if self._detail is not None and self._detail.isVisible():
+            self._detail.hide()
+            self.resize(self.width(), self.height() - self._detail.height() - self.layout().spacing())
+            self._detail.model.set_day(None)  # stop following store changes for it
+
+    # Search bar
+    def _toggle_search(self, show=None):
+        show = not self.search_bar.isVisible() if show is None else show
+        self.search_bar.setVisible(show)
+        if show:
+            self.calendar.search.ensure_built()  # once, before the first keystroke
+            self.search_edit.setFocus()
+            self.search_edit.selectAll()
+            self._run_search()
+        else:
+            self._match = None
+            self.calendar.set_highlight(None)
+            self.calendar.setFocus()
+
+    def _run_search(self):
+        if not self.search_bar.isVisible():
+            return
+        self._match = self.calendar.search.find(self.search_edit.text())
+        if self._match is None:
+            self.lbl_matches.setText("")
+            self.calendar.set_highlight(None)
+            return
+        self.lbl_matches.setText(f"{len(self._match):,} match{'es' if len(self._match) != 1 else ''}")
+        self.calendar.set_highlight(self._match.ids)
+
+    def _step_match(self, step):
+        """Jump to the next (step 1) or previous (-1) day on which a match starts."""
+        if self._match is None:
+            return
+        day = self.calendar.selectedDate().toJulianDay()
+        jd = self._match.next(day) if step > 0 else self._match.prev(day)
+        if jd is None:
+            self.lbl_matches.setText("No more matches")
+            return
+        d = jd_to_qdate(jd)
+        self.calendar.setCurrentPage(d.year(), d.month())
+        self.calendar.setSelectedDate(d)
+        self.lbl_matches.setText(f"{len(self._match):,} · {d.toString('yyyy-MM-dd')}")
+
+    def _on_selection_changed(self):
+        """Show start_date / end_date in the calendar overlay and the info label."""
+        s, e = self.start_date, self.end_date
+        self.calendar.set_selection(None if s is None else s.toJulianDay(), None if e is None else e.toJulianDay())
         self._refresh_info_label()
-        # refresh calendar (we didn't override selection visuals, but we redraw)
-        self.calendar.viewport().update()
-
-        # show a small dialog with project list for that date (if any)
-        key = qdate.toString("yyyy-MM-dd")
-        projects = self.calendar.project_map.get(key, [])
-        if projects:
-            # Build message
-            msg = "\n".join(f"{i+1}. {p}" for i,p in enumerate(projects[:20]))
-            if len(projects) > 20:
-                msg += f"\n... and {len(projects)-20} more"
-            QMessageBox.information(self, f"Projects on {key}", msg)
+
+    def _on_projects_changed(self, lo, hi):
+        """Refresh the range load when the tick's changes touch the selected range."""
+        if not (self.start_date and self.end_date):
+            return
+        s, e = sorted((self.start_date.toJulianDay(), self.end_date.toJulianDay()))
+        if lo <= e and hi >= s:
+            self._refresh_info_label()
 
     def _refresh_info_label(self):
         if not self.start_date:
@@ -397,35 +4780,48 @@ class FloatingCalendar(QWidget):
         else:
             s = self.start_date; e = self.end_date
             if s > e: s,e = e,s
-            self.lbl_info.setText(f"Range: {s.toString('yyyy-MM-dd')} → {e.toString('yyyy-MM-dd')}")
+            lo, hi = s.toJulianDay(), e.toJulianDay()
+            prof = self.calendar.load_profile(lo, hi)
+            total, peak = prof.total(lo, hi), prof.peak(lo, hi)
+            if self.calendar.display_mode == "weighted":
+                load = f"load {total:g}, peak {peak:g}"
+            else:
+                load = f"{total:g} project-days, peak {peak:g}"
+            self.lbl_info.setText(f"Range: {s.toString('yyyy-MM-dd')} → {e.toString('yyyy-MM-dd')}\n{load}")
+
+    def _cycle_heatmap(self):
+        """Projects -> load heatmap (count) -> weighted heatmap -> projects."""
+        modes = CustomCalendar.DISPLAY_MODES
+        mode = modes[(modes.index(self.calendar.display_mode) + 1) % len(modes)]
+        self.calendar.set_display_mode(mode)
+        self.btn_load.setText({"projects": "Load", "count": "Load: n", "weighted": "Load: w"}[mode])
+        self._refresh_info_label()  # the range total follows the weighting
 
     # Quick-jump helpers
     def _go_today(self):
         self.calendar.setSelectedDate(QDate.currentDate())
         self.calendar.showSelectedDate()
         self.start_date = None; self.end_date = None
-        self._refresh_info_label()
+        self._on_selection_changed()
 
     def _go_week(self):
         d = QDate.currentDate()
         start = d.addDays(-(d.dayOfWeek()-1))
         end = start.addDays(6)
         self.start_date = QDate(start); self.end_date = QDate(end)
-        self._refresh_info_label()
-        self.calendar.viewport().update()
+        self._on_selection_changed()
 
     def _go_month(self):
         d = QDate.currentDate()
         start = QDate(d.year(), d.month(), 1)
         end = start.addMonths(1).addDays(-1)
         self.start_date = QDate(start); self.end_date = QDate(end)
-        self._refresh_info_label()
-        self.calendar.viewport().update()
+        self._on_selection_changed()
 
     # Minimize / restore / close
     def _minimize_to_bar(self):
         self._last_geom = self.geometry()
-        screen_geo = QApplication.primaryScreen().availableGeometry()
+        screen_geo = self.screens.available(self.frameGeometry())  # the bar stays on this screen
         mb_geo = self.mini_bar.geometry()
         mb_x = screen_geo.right() - mb_geo.width() - 24
         mb_y = screen_geo.bottom() - mb_geo.height() - 24
@@ -434,68 +4830,239 @@ class FloatingCalendar(QWidget):
         self.mini_bar.show()
 
     def _restore_from_bar(self):
-        if self._last_geom:
+        if self._last_geom and self.screens.shows(self._last_geom):
             self.setGeometry(self._last_geom)
         else:
-            screen_geo = QApplication.primaryScreen().availableGeometry()
+            # never minimised, or its monitor is gone: next to the bar, on the bar's screen
+            screen_geo = self.screens.available(self.mini_bar.frameGeometry())
             self.move(screen_geo.right() - self.width() - 24, screen_geo.bottom() - self.height() - 24)
         self.show()
         self.mini_bar.hide()
 
     def _close_app(self):
+        if self._control is not None:
+            self._control.close()
+        if self._sync is not None:
+            self._sync.stop()
+        for job in (self._export_job, self._import_job):
+            if job is not None:
+                job.requestInterruption()
+                job.wait()
         if self.tray:
             self.tray.hide()
-        self.mini_bar.close()
+        if self._mini_bar is not None:
+            self._mini_bar.close()
         self.close()
+        if self.db:
+            self.db.close()
+            self.db = None
+        if self.journal:
+            self.calendar.store.close()
+            self.journal = None
+
+    def _toggle_done_selection(self):
+        """Mark the projects in the selection completed (or reopen them if all already are)."""
+        if not self.start_date:
+            QMessageBox.information(self, "No selection", "No dates selected.")
+            return
+        s = self.start_date; e = self.end_date or self.start_date
+        if s > e: s,e = e,s
+        lo, hi = s.toJulianDay(), e.toJulianDay()
+        done = not all(p.done for p in self.calendar.store.query(lo, hi, recurring=True))
+        self.calendar.mark_done(lo, hi, done)
 
     # Copy & Export (range inclusive)
-    def _copy_selection(self):
+    def _copy_selection(self, mode=None):
+        """Copy the selection in compact ISO 8601 notation (mode: see iter_copy_lines).
+
+        Payloads above CLIPBOARD_CHUNK_CHARS are copied in parts: pressing Copy
+        again on the same selection copies the next part. The confirmation only
+        shows a summary.
+        """
         if not self.start_date:
             QMessageBox.information(self, "No selection", "No dates selected.")
             return
-        if self.start_date and not self.end_date:
-            txt = self.start_date.toString("yyyy-MM-dd")
+        s = self.start_date; e = self.end_date or self.start_date
+        if s > e: s,e = e,s
+        lo, hi = s.toJulianDay(), e.toJulianDay()
+        pending = self._copy_pending
+        if pending is not None and pending["range"] == (lo, hi) and mode in (None, pending["mode"]):
+            pending["part"] += 1
         else:
-            s = self.start_date; e = self.end_date
-            if s > e: s,e = e,s
-            txt = ",".join((s.addDays(i).toString("yyyy-MM-dd") for i in range(s.daysTo(e)+1)))
-        QGuiApplication.clipboard().setText(txt)
-        QMessageBox.information(self, "Copied", f"Copied: {txt}")
+            if mode is None:
+                box = QMessageBox(QMessageBox.Icon.Question, "Copy", "What should be copied?",
+                                  QMessageBox.StandardButton.Cancel, self)
+                buttons = {box.addButton(label, QMessageBox.ButtonRole.AcceptRole): m for label, m in
+                           (("Date range", "range"), ("Days with projects", "busy"), ("Projects", "projects"))}
+                box.exec()
+                mode = buttons.get(box.clickedButton())
+                if mode is None:
+                    return
+            records = [] if mode == "range" else self.calendar.store.export_records(lo, hi, recurring=True)
+            chunks = iter_text_chunks(iter_copy_lines(records, lo, hi, mode, self.calendar.status.today))
+            pending = {"range": (lo, hi), "mode": mode, "chunks": chunks, "part": 1,
+                       "next": next(chunks, None)}
+        # one part is held ahead so the summary can tell whether more remain
+        chunk, pending["next"] = pending["next"], next(pending["chunks"], None)
+        self._copy_pending = pending if pending["next"] is not None else None
+        if chunk is None:
+            QMessageBox.information(self, "Copy", "Nothing to copy: no projects in the selection.")
+            return
+        text, lines = chunk
+        QGuiApplication.clipboard().setText(text)
+        first = text.split("\n", 1)[0]
+        summary = (f"{lines:,} line(s), {len(text):,} characters for {hi - lo + 1:,} day(s).\n"
+                   f"First line: {first[:80]}{'…' if len(first) > 80 else ''}")
+        if pending["part"] > 1 or self._copy_pending is not None:
+            summary = f"Part {pending['part']}: " + summary
+        if self._copy_pending is not None:
+            summary += "\nPress Copy again for the next part."
+        QMessageBox.information(self, "Copied", summary)
 
-    def _export_csv(self):
+    def _export_csv(self, only_with_projects=None):
+        """Export (date, project, status) rows for the selection on a worker thread."""
         if not self.start_date:
             QMessageBox.information(self, "No selection", "No dates selected.")
             return
-        if self.start_date and not self.end_date:
-            rows = [(self.start_date.toString("yyyy-MM-dd"),)]
-        else:
-            s = self.start_date; e = self.end_date
-            if s > e: s,e = e,s
-            rows = []
-            for i in range(s.daysTo(e)+1):
-                d = s.addDays(i)
-                rows.append((d.toString("yyyy-MM-dd"),))
+        if self._export_job is not None:
+            QMessageBox.information(self, "Export running", "An export is already in progress.")
+            return
+        s = self.start_date; e = self.end_date or self.start_date
+        if s > e: s,e = e,s
+        if only_with_projects is None:
+            box = QMessageBox(QMessageBox.Icon.Question, "Export (CSV)", "Which days should be exported?",
+                              QMessageBox.StandardButton.Cancel, self)
+            btn_all = box.addButton("All days", QMessageBox.ButtonRole.AcceptRole)
+            btn_busy = box.addButton("Only days with projects", QMessageBox.ButtonRole.AcceptRole)
+            box.exec()
+            if box.clickedButton() not in (btn_all, btn_busy):
+                return
+            only_with_projects = box.clickedButton() is btn_busy
         fn, _ = QFileDialog.getSaveFileName(self, "Save CSV", "dates.csv", "CSV Files (*.csv);;All Files (*)")
         if not fn:
             return
+        lo, hi = s.toJulianDay(), e.toJulianDay()
+        job = CsvExportThread(fn, self.calendar.store.export_records(lo, hi, recurring=True), lo, hi,
+                              only_with_projects, self, today=self.calendar.status.today)
+        progress = QProgressDialog("Exporting...", "Cancel", 0, hi - lo + 1, self)
+        progress.setWindowTitle("Export (CSV)")
+        progress.setMinimumDuration(300)
+        progress.setAutoClose(True)
+        progress.canceled.connect(job.requestInterruption)
+        job.progress.connect(lambda done, total: progress.setValue(done))
+        job.done.connect(lambda n, path: QMessageBox.information(self, "Saved", f"Saved {n} rows to {path}"))
+        job.failed.connect(lambda msg: QMessageBox.critical(self, "Error", f"Could not save file: {msg}"))
+        job.finished.connect(progress.reset)
+        job.finished.connect(self._on_export_finished)
+        self._export_job = job
+        job.start()
+        return job
+
+    def _on_export_finished(self):
+        job, self._export_job = self._export_job, None
+        if job is not None:
+            job.deleteLater()
+
+    def _import_schedule(self, path=None):
+        """Parse a CSV / JSON / ICS schedule in the background and merge it into the calendar."""
+        if self._import_job is not None:
+            QMessageBox.information(self, "Import running", "An import is already in progress.")
+            return
+        if path is None:
+            path, _ = QFileDialog.getOpenFileName(self, "Import schedule", "",
+                                                  "Schedules (*.csv *.json *.ics);;All Files (*)")
+            if not path:
+                return
+        job = ScheduleImportThread(path, parent=self)
+        progress = QProgressDialog("Importing...", "Cancel", 0, 0, self)
+        progress.setWindowTitle("Import")
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(job.requestInterruption)
+        job.progress.connect(lambda done, total: (progress.setMaximum(total), progress.setValue(done)))
+        job.batch.connect(self.calendar.store.add_many)  # queued: merged on the GUI thread
+        job.rules_found.connect(lambda rules: [self.calendar.store.add_rule(**r) for r in rules])
+        self.calendar.history.begin_group()  # the whole import is one undo step
+        job.finished.connect(self.calendar.history.end_group)
+        job.done.connect(lambda n: QMessageBox.information(self, "Imported", f"Imported {n} projects from {path}"))
+        job.failed.connect(lambda msg: QMessageBox.critical(self, "Error", f"Could not import file: {msg}"))
+        job.finished.connect(progress.reset)
+        job.finished.connect(self._on_import_finished)
+        self._import_job = job
+        job.start()
+        return job
+
+    def watch_schedule(self, path):
+        """Keep the calendar in step with a schedule file written by another program."""
+        if self._sync is not None:
+            self._sync.stop()
+            self._sync.deleteLater()
+        self._sync = ScheduleSync(self.calendar.store, path, parent=self)
+        self._sync.synced.connect(
+            lambda added, removed: self.lbl_title.setToolTip(f"Synced from {path}: +{added} / -{removed}"))
+        self._sync.failed.connect(lambda msg: self.lbl_title.setToolTip(f"Sync from {path} failed: {msg}"))
+        return self._sync
+
+    def serve_ipc(self, name=None):
+        """Accept JSON-lines commands from scripts and later launches (ControlServer)."""
+        server = ControlServer(self, name, self)
+        if not server.listen():
+            print(f"Control API unavailable: {server.server.errorString()}", file=sys.stderr)
+            return None
+        self._control = server
+        return server
+
+    def handle_args(self, argv, cwd=None):
+        """Command line of a second launch, forwarded by forward_to_running()."""
         try:
-            with open(fn, "w", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerows(rows)
-            QMessageBox.information(self, "Saved", f"Saved {len(rows)} rows to {fn}")
-        except Exception as ex:
-            QMessageBox.critical(self, "Error", f"Could not save file: {ex}")
+            args, _ = build_arg_parser().parse_known_args(argv)
+        except SystemExit:
+            raise ValueError(f"invalid arguments: {argv}")
+        if args.watch:
+            self.watch_schedule(os.path.join(cwd or os.getcwd(), args.watch))
+        if args.schedule:
+            self._import_schedule(os.path.join(cwd or os.getcwd(), args.schedule))
+        if not self.isVisible():
+            self._restore_from_bar()
+        self.raise_()
+        self.activateWindow()
+
+    def _on_import_finished(self):
+        job, self._import_job = self._import_job, None
+        if job is not None:
+            job.deleteLater()
 
     # Keyboard events (shortcuts)
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Escape:
-            self.start_date = None; self.end_date = None; self._refresh_info_label(); self.calendar.viewport().update()
+        if event.key() == Qt.Key.Key_Escape and self.search_bar.isVisible():
+            self._toggle_search(False)
+        elif event.key() == Qt.Key.Key_Escape and self._detail is not None and self._detail.isVisible():
+            self._hide_detail()
+        elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_F:
+            self._toggle_search(True)
+        elif event.key() == Qt.Key.Key_F3:
+            self._step_match(-1 if event.modifiers() & Qt.KeyboardModifier.ShiftModifier else 1)
+        elif event.key() == Qt.Key.Key_Escape:
+            self.start_date = None; self.end_date = None; self._on_selection_changed()
         elif event.key() == Qt.Key.Key_T:
             self._go_today()
+        elif event.key() == Qt.Key.Key_Y:
+            self._toggle_overview()
+        elif event.key() == Qt.Key.Key_H:
+            self._cycle_heatmap()
+        elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_D:
+            self._toggle_done_selection()
+        elif event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Z:
+            self.calendar.history.undo()
+        elif (event.modifiers() == Qt.KeyboardModifier.ControlModifier and event.key() == Qt.Key.Key_Y) or \
+                (event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier)
+                 and event.key() == Qt.Key.Key_Z):
+            self.calendar.history.redo()
         elif event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier) and event.key() == Qt.Key.Key_C:
             self._copy_selection()
         elif event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier) and event.key() == Qt.Key.Key_E:
             self._export_csv()
+        elif event.modifiers() == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier) and event.key() == Qt.Key.Key_I:
+            self._import_schedule()
         else:
             super().keyPressEvent(event)
 
@@ -600,10 +5167,14 @@ class MiniBar(QWidget):
         self.parent._close_app()
 
 # -----------------------
-# Helper to apply project_map programmatically
+# Helper to apply project_map programmatically (compatibility shim)
 # project_map: dict 'YYYY-MM-DD' -> list of project type strings
 # Example:
 # { '2025-11-14': ['Fabrication','Installation'] }
+# New code should add records to widget_calendar.store instead:
+# widget_calendar.store.add("Bay 3 install", "Installation", "2025-11-14", "2026-05-14")
+# Schedules produced by another program can be live-synced with
+# FloatingCalendar.watch_schedule(path) (or --watch path).
 # -----------------------
 def apply_project_map_to_widget(widget_calendar, project_map):
     widget_calendar.set_project_map(project_map)
@@ -611,11 +5182,53 @@ def apply_project_map_to_widget(widget_calendar, project_map):
 # -----------------------
 # Run
 # -----------------------
+def build_arg_parser():
+    import argparse
+    ap = argparse.ArgumentParser(description="Floating color-coded calendar")
+    ap.add_argument("schedule", nargs="?", help="CSV / JSON / ICS schedule file to import")
+    ap.add_argument("--db", help="project database file (default: per-user app data)")
+    ap.add_argument("--demo", action="store_true", help="show in-memory demo projects instead of the database")
+    ap.add_argument("--journal", metavar="DIR", nargs="?", const="",
+                    help="save projects as an append-only journal with snapshots in DIR instead of the database "
+                         "(default DIR: per-user app data)")
+    ap.add_argument("--startup-profile", action="store_true", help="print a per-phase startup timing breakdown")
+    ap.add_argument("--watch", metavar="FILE", help="live-sync projects from a CSV / JSON / ICS schedule file")
+    ap.add_argument("--undo-depth", type=int, default=100, help="number of undo steps kept (default: 100)")
+    ap.add_argument("--new-instance", action="store_true",
+                    help="start another window instead of handing the arguments to the running one")
+    return ap
+
 def main():
-    app = QApplication(sys.argv)
+    ap = build_arg_parser()
+    args, qt_args = ap.parse_known_args()
+    if not args.new_instance and forward_to_running(sys.argv[1:]):
+        return  # the running instance took the arguments
+    profile = None
+    if args.startup_profile:
+        profile = StartupProfile(_T_START)
+        profile.mark("imports", _T_IMPORTED)
+    profile_path = os.environ.get(PROFILE_ENV)
+    app_cls = ProfilingApplication if profile_path else QApplication
+    app = app_cls([sys.argv[0]] + qt_args)
+    app.setApplicationName("FloatingCalendar")
     app.setApplicationDisplayName("Floating Calendar")
-    win = FloatingCalendar()
+    if profile_path:
+        enable_profiling(None if profile_path == "1" else profile_path)
+    if profile is not None:
+        profile.mark("QApplication")
+    journal = None if args.demo or args.journal is None else (args.journal or ProjectJournal.default_path())
+    db_path = None if args.demo or journal else (args.db or ProjectDatabase.default_path())
+    win = FloatingCalendar(db_path, profile, journal)
+    win.calendar.history.set_depth(args.undo_depth)
+    if args.watch:
+        win.watch_schedule(args.watch)
+    if not args.new_instance:
+        win.serve_ipc()
     win.show()
+    if args.schedule:
+        win._import_schedule(args.schedule)
+    if profile is not None:
+        profile.mark("show")
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,634 @@
+#!/usr/bin/env python3
+# bench_calendar.py
+# Headless benchmarks for the floating calendar (runs on the offscreen Qt platform)
+# Usage:
+#   python bench_calendar.py                       -> writes bench_results.json
+#   python bench_calendar.py -o new.json --compare old.json
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse, importlib.util, json, platform, statistics, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CALENDAR_SRC = os.path.join(HERE, "..py")
+
+
+def load_calendar_module():
+    spec = importlib.util.spec_from_file_location("floating_calendar", CALENDAR_SRC)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod  # lets worker processes unpickle the parsers
+    spec.loader.exec_module(mod)
+    return mod
+
+
+cal_mod = load_calendar_module()
+
+from PyQt6.QtWidgets import QApplication, QMessageBox, QFileDialog
+from PyQt6.QtCore import QDate, QEvent, QPoint, QPointF, Qt, QT_VERSION_STR
+from PyQt6.QtGui import QGuiApplication, QMouseEvent
+
+TYPES = [t for t in cal_mod.PALETTE if t != "Today"]
+
+# -----------------------
+# Fixtures: legacy 'YYYY-MM-DD' -> [types] maps and store-level project lists
+# -----------------------
+def month_map(per_day, start=None, days=42):
+    """Every day of a visible page carries per_day projects."""
+    start = start or QDate.currentDate().addDays(-21)
+    types = [TYPES[i % len(TYPES)] for i in range(per_day)]
+    return {start.addDays(i).toString("yyyy-MM-dd"): list(types) for i in range(days)} if per_day else {}
+
+
+def decade_map(per_day=4, start=None):
+    """Ten years of expanded per-day entries (the legacy format's worst case)."""
+    return month_map(per_day, start or QDate.currentDate().addYears(-5), days=3653)
+
+
+def decade_projects(n=5000, start=None, seed=7):
+    """n multi-week projects scattered over ten years, as (name, type, start_jd, end_jd)."""
+    import random
+    rnd = random.Random(seed)
+    lo = (start or QDate.currentDate().addYears(-5)).toJulianDay()
+    out = []
+    for i in range(n):
+        s = lo + rnd.randrange(3653)
+        out.append((f"job-{i}", TYPES[i % len(TYPES)], s, s + rnd.randrange(7, 90)))
+    return out
+
+
+FIXTURES = {
+    "empty": lambda: month_map(0),
+    "typical_4": lambda: month_map(4),
+    "dense_9": lambda: month_map(9),
+    "pathological_60": lambda: month_map(60),
+    "decade_4": lambda: decade_map(4),
+}
+
+# -----------------------
+# Helpers
+# -----------------------
+def summarize(samples):
+    """Millisecond stats for a list of second-based samples."""
+    ms = sorted(x * 1000.0 for x in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "min_ms": round(ms[0], 4),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def peak_alloc(fn):
+    """(result, peak bytes allocated by Python while running fn)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def retained_alloc(build):
+    """Bytes still allocated by Python after build() returns (result kept alive)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def max_rss_kb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:  # Windows
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# -----------------------
+# Benchmarks
+# -----------------------
+class Bench:
+    def __init__(self, app, frames):
+        self.app = app
+        self.frames = frames
+        self.win = cal_mod.FloatingCalendar()
+        self.win.show()
+        self.cal = self.win.calendar
+        self.app.processEvents()
+        # dialogs would block a headless run
+        QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)
+        QMessageBox.critical = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self._tmpdir.name, "bench.csv")
+        QFileDialog.getSaveFileName = staticmethod(lambda *a, **k: (self.csv_path, ""))
+
+    def settle(self):
+        self.app.processEvents()
+        self.app.processEvents()
+
+    def load(self, project_map):
+        self.cal.set_project_map(project_map)
+        self.settle()
+
+    def paint(self, fixture):
+        self.load(FIXTURES[fixture]())
+        vp = self.cal.viewport()
+        cold = []
+        for _ in range(max(3, self.frames // 10)):
+            self.cal.cell_cache.clear()
+            t0 = time.perf_counter(); vp.repaint(); cold.append(time.perf_counter() - t0)
+        warm = timed(vp.repaint, self.frames)
+        return {"cold_frame": summarize(cold), "warm_frame": summarize(warm),
+                "frame_per_cell_us": round(statistics.fmean(warm) * 1e6 / 42, 3)}
+
+    def month_switch(self, fixture):
+        self.load(FIXTURES[fixture]())
+        vp = self.cal.viewport()
+        y, m = self.cal.yearShown(), self.cal.monthShown()
+        samples = []
+        for i in range(self.frames):
+            d = QDate(y, m, 1).addMonths(1 if i % 2 == 0 else 0)
+            t0 = time.perf_counter()
+            self.cal.setCurrentPage(d.year(), d.month())
+            vp.repaint()
+            samples.append(time.perf_counter() - t0)
+        self.cal.setCurrentPage(y, m)
+        return summarize(samples)
+
+    def map_load(self, fixture):
+        project_map = FIXTURES[fixture]()
+        self.load({})
+        samples = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            self.cal.set_project_map(project_map)
+            self.cal.visible_projects()  # forces the lazy index build
+            samples.append(time.perf_counter() - t0)
+            self.settle()
+        self.load({})
+        _, peak = peak_alloc(lambda: (self.cal.set_project_map(project_map), self.cal.visible_projects()))
+        self.settle()
+        return {"load": summarize(samples), "day_entries": sum(len(v) for v in project_map.values()),
+                "records": len(self.cal.store), "peak_alloc_bytes": peak}
+
+    def store_query(self):
+        store = cal_mod.ProjectStore()
+        rows = decade_projects()
+        _, peak = peak_alloc(lambda: [store.add(*r) for r in rows] and store.bounds())
+        lo, _ = store.bounds()
+        day = timed(lambda: store.on_day(lo + 1800), 200)
+        month = timed(lambda: store.query(lo + 1800, lo + 1841), 200)
+        return {"projects": len(store), "build_peak_alloc_bytes": peak,
+                "day_query": summarize(day), "page_query": summarize(month)}
+
+    def overview_scroll(self, n=20000):
+        """Year overview over ten years of dense data: frame time while scrolling
+        into unrendered months (cold) and back over cached tiles (warm)."""
+        self.load({})
+        self.cal.store.add_many(decade_projects(n))
+        self.settle()
+        self.win._toggle_overview()
+        ov = self.win.overview
+        ov.resize(560, 460)
+        self.settle()
+        sb = ov.verticalScrollBar()
+        start = sb.value()
+        def scroll(step):
+            samples = []
+            for _ in range(self.frames * 4):
+                sb.setValue(sb.value() + step)
+                t0 = time.perf_counter(); ov.viewport().repaint(); samples.append(time.perf_counter() - t0)
+            return samples
+        ov.tiles.clear()
+        cold = scroll(ov.tile_h // 3)
+        warm = scroll(-(ov.tile_h // 3))
+        sb.setValue(start)
+        self.win._toggle_overview()
+        return {"projects": n, "cold_frame": summarize(cold), "warm_frame": summarize(warm),
+                "tile_bytes": ov.tiles.used_bytes}
+
+    def search_index(self, n=50000):
+        """Search bar index over n projects: first build, prefix queries, and
+        the index update after a single edit."""
+        store = cal_mod.ProjectStore()
+        store.add_many(decade_projects(n))
+        index = cal_mod.SearchIndex(store)
+        t0 = time.perf_counter()
+        index.ensure_built()
+        build = time.perf_counter() - t0
+        queries = {q: summarize(timed(lambda q=q: index.find(q), 20)) for q in ("f", "fab", "job 12", "zzz")}
+        lo, _ = store.bounds()
+        def edit():
+            store.add("job search", "Extra", lo + 1800)
+            index._flush()
+        return {"projects": n, "build_ms": round(build * 1000, 3), "query": queries,
+                "edit_update": summarize(timed(edit, 50)), "words": len(index._postings)}
+
+    def workload(self, n=20000):
+        """Workload heatmap over n projects in ten years: the difference-array
+        build for a page and for the whole decade, then range total / peak."""
+        store = cal_mod.ProjectStore()
+        store.add_many(decade_projects(n))
+        lo, hi = store.bounds()
+        records = store.export_records(lo, hi)
+        page = timed(lambda: cal_mod.LoadProfile(lo + 1800, lo + 1841, store.export_records(lo + 1800, lo + 1841)), 50)
+        t0 = time.perf_counter()
+        prof = cal_mod.LoadProfile(lo, hi, records, cal_mod.LOAD_WEIGHTS)
+        build = time.perf_counter() - t0
+        spans = [(lo + i * 37 % 3000, lo + i * 37 % 3000 + i % 600) for i in range(1000)]
+        ranges = timed(lambda: [(prof.total(a, b), prof.peak(a, b)) for a, b in spans], 20)
+        return {"projects": n, "days": hi - lo + 1, "page_build": summarize(page),
+                "decade_build_ms": round(build * 1000, 3), "range_1000_queries": summarize(ranges)}
+
+    def range_label_edits(self, n=50000, edits=20):
+        """Single-project edit ticks with a whole-decade range selected, against
+        none selected: the range load in the info label is patched, not rebuilt."""
+        self.load({})
+        store = self.cal.store
+        store.add_many(decade_projects(n))
+        self.settle()
+        lo, hi = store.bounds()
+        today = self.cal.status.today
+
+        def edit():
+            pid = store.add("edit", "Fabrication", today, today + 2).pid
+            self.settle()
+            store.remove(pid)
+            self.settle()
+
+        self.win.start_date = self.win.end_date = None
+        self.win._on_selection_changed()
+        idle = timed(edit, edits)
+        self.win.start_date, self.win.end_date = cal_mod.jd_to_qdate(lo), cal_mod.jd_to_qdate(hi)
+        self.win._on_selection_changed()
+        label = self.win.lbl_info.text()
+        selected = timed(edit, edits)
+        assert self.win.lbl_info.text() == label, (label, self.win.lbl_info.text())
+        self.win.start_date = self.win.end_date = None
+        self.win._on_selection_changed()
+        self.load({})
+        return {"projects": n, "selected_days": hi - lo + 1,
+                "edit_tick_no_selection": summarize(idle), "edit_tick_decade_selected": summarize(selected)}
+
+    def journal(self, n=50000, tail=2000):
+        """Journal persistence with n projects: cost of saving one edit
+        (journal + fsync), writing a snapshot, and reopening from the
+        snapshot plus a tail of journalled edits."""
+        with tempfile.TemporaryDirectory() as d:
+            store = cal_mod.JournalProjectStore(cal_mod.ProjectJournal(d))
+            store.add_many(decade_projects(n))
+            store.commit()
+            store.journal.sync()
+            lo, _ = store.bounds()
+            def edit():
+                store.add("job edit", "Extra", lo + 1800)
+                store.commit()
+                store.journal.sync()
+            save = timed(edit, 50)
+            gen = store.journal.rotate()
+            t0 = time.perf_counter()
+            store.journal.write_snapshot(gen, store.all_records(), [])
+            snapshot = time.perf_counter() - t0
+            for i in range(tail):
+                store.add(f"tail {i}", "Extra", lo + i % 3000)
+            store.commit()
+            store.close()
+            t0 = time.perf_counter()
+            reopened = cal_mod.JournalProjectStore(cal_mod.ProjectJournal(d))
+            reopen = time.perf_counter() - t0
+            reopened.close()
+            return {"projects": len(reopened), "edit_save": summarize(save),
+                    "snapshot_ms": round(snapshot * 1000, 3),
+                    "snapshot_bytes": os.path.getsize(os.path.join(d, cal_mod.ProjectJournal.SNAPSHOT)),
+                    "reopen_ms": round(reopen * 1000, 3), "replayed_lines": tail}
+
+    def day_detail(self, n=5000):
+        """Day detail panel on a day with n projects: opening it (model reset
+        plus first fetch) and the row update after a single edit."""
+        self.load({})
+        store = self.cal.store
+        day = QDate.currentDate().toJulianDay()
+        store.add_many([(f"job {i}", TYPES[i % len(TYPES)], day - i % 5, day + i % 7) for i in range(n)])
+        self.settle()
+        self.win._show_detail(day)
+        panel = self.win._detail
+        self.settle()
+        def open_day():
+            panel.show_day(day)
+            panel.view.viewport().repaint()
+        opened = timed(open_day, 20)
+        def edit():
+            store.add("job edit", "Extra", day)
+            panel.model._apply_changes()
+        update = timed(edit, 50)
+        shown = panel.model.total()
+        self.win._hide_detail()
+        return {"projects": shown, "open": summarize(opened), "edit_update": summarize(update)}
+
+    def window_drag(self, seconds=0.5, hz=1000):
+        """Header drag fed by a high polling rate mouse: window moves actually
+        made (coalesced to the display frame rate) and time per mouse event."""
+        win, header = self.win, self.win.header_widget
+        moves = []
+        move = win.move
+        def counted_move(*args):
+            moves.append(args)
+            move(*args)
+        win.move = counted_move
+        left = Qt.MouseButton.LeftButton
+        def mouse(kind, pos, buttons=left):
+            return QMouseEvent(kind, QPointF(10, 10), QPointF(pos), left, buttons, Qt.KeyboardModifier.NoModifier)
+        start = win.frameGeometry().topLeft() + QPoint(20, 10)
+        self.app.sendEvent(header, mouse(QEvent.Type.MouseButtonPress, start))
+        samples = []
+        t_end = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < t_end:
+            i += 1
+            ev = mouse(QEvent.Type.MouseMove, start - QPoint(i % 200, i % 100))
+            t0 = time.perf_counter()
+            self.app.sendEvent(header, ev)
+            self.app.processEvents()
+            samples.append(time.perf_counter() - t0)
+            time.sleep(1 / hz)
+        self.app.sendEvent(header, mouse(QEvent.Type.MouseButtonRelease, start, Qt.MouseButton.NoButton))
+        self.settle()
+        del win.move
+        return {"mouse_events": i, "window_moves": len(moves), "frame_ms": round(win.screens.frame_ms(), 3),
+                "per_event": summarize(samples)}
+
+    def recurring_pages(self, rules=200, months=120):
+        """Open-ended recurring rules: month switches over ten years, with the
+        occurrences expanded per page and memoised per month."""
+        self.load({})
+        store = self.cal.store
+        lo = QDate.currentDate().toJulianDay()
+        for i in range(rules):
+            freq = cal_mod.RECUR_FREQS[i % 3]
+            store.add_rule(f"r{i}", TYPES[i % len(TYPES)], lo + i % 28, freq, interval=1 + i % 4)
+        self.settle()
+        vp = self.cal.viewport()
+        y, m = self.cal.yearShown(), self.cal.monthShown()
+        samples = []
+        for i in range(months):
+            d = QDate(y, m, 1).addMonths(i + 1)
+            t0 = time.perf_counter()
+            self.cal.setCurrentPage(d.year(), d.month())
+            vp.repaint()
+            samples.append(time.perf_counter() - t0)
+        memo = store.rules.memo_size()
+        self.cal.setCurrentPage(y, m)
+        for rule in list(store.rules):
+            store.remove_rule(rule.rid)
+        self.settle()
+        return {"rules": rules, "month_switch": summarize(samples), "memo_months": memo}
+
+    def day_entry_memory(self, entries=1_000_000, per_day=4):
+        """Legacy {'YYYY-MM-DD': [type strings]} against CompactDayMap for the same day entries."""
+        lo = QDate.currentDate().toJulianDay()
+        days = entries // per_day
+        types = [TYPES[i % len(TYPES)] for i in range(per_day)]
+        tids = [cal_mod.intern_type(t) for t in types]
+        legacy, legacy_bytes = retained_alloc(
+            lambda: {cal_mod.jd_to_iso(lo + i): list(types) for i in range(days)})
+        compact, compact_bytes = retained_alloc(
+            lambda: cal_mod.CompactDayMap((lo + i, tids) for i in range(days)))
+        assert compact.entry_count() == sum(len(v) for v in legacy.values()) == days * per_day
+        lookup = timed(lambda: compact.get(lo + days // 2), 1000)
+        return {"day_entries": days * per_day, "legacy_bytes": legacy_bytes, "compact_bytes": compact_bytes,
+                "savings_ratio": round(legacy_bytes / max(1, compact_bytes), 2), "compact_lookup": summarize(lookup)}
+
+    def _select(self, days):
+        s = QDate.currentDate()
+        self.win.start_date = QDate(s)
+        self.win.end_date = s.addDays(days - 1)
+
+    def copy_selection(self, days, mode="range"):
+        self.load(FIXTURES["typical_4"]())
+        self._select(days)
+        samples, peak = peak_alloc(lambda: timed(lambda: self.win._copy_selection(mode), 5))
+        return {"days": days, "mode": mode, "copy": summarize(samples), "peak_alloc_bytes": peak,
+                "clipboard_chars": len(QGuiApplication.clipboard().text())}
+
+    def _export_and_wait(self, only_with_projects):
+        job = self.win._export_csv(only_with_projects=only_with_projects)
+        job.wait()
+        self.settle()
+
+    def export_csv(self, days, only_with_projects=False):
+        self.load(FIXTURES["typical_4"]())
+        self._select(days)
+        samples, peak = peak_alloc(lambda: timed(lambda: self._export_and_wait(only_with_projects), 3))
+        return {"days": days, "only_with_projects": only_with_projects,
+                "export": summarize(samples), "peak_alloc_bytes": peak,
+                "file_bytes": os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0}
+
+    def import_csv(self, n):
+        path = os.path.join(self._tmpdir.name, f"import_{n}.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("name,type,start,end\n")
+            for name, ptype, s, e in decade_projects(n):
+                f.write(f"{name},{ptype},{cal_mod.jd_to_iso(s)},{cal_mod.jd_to_iso(e)}\n")
+        self.load({})
+        ticks = 0
+        t0 = time.perf_counter()
+        self.win._import_schedule(path)
+        while self.win._import_job is not None:
+            self.app.processEvents()
+            ticks += 1
+        elapsed = time.perf_counter() - t0
+        return {"records": len(self.cal.store), "file_bytes": os.path.getsize(path),
+                "wall_ms": round(elapsed * 1000, 3), "event_loop_ticks": ticks}
+
+    def import_chunking(self, n=30, sizes=(64, 500, 4096, 1 << 30)):
+        """Per-day export rows and a folded iCalendar file imported with several
+        chunk sizes: chunk boundaries must not change the records (runs are
+        stitched across them, folded lines unfolded across them)."""
+        import random
+        rnd = random.Random(11)
+        lo = QDate.currentDate().toJulianDay()
+        rows = []
+        for k in range(n):
+            s = rnd.randrange(60)
+            rows.extend((d, f"job-{k % 12}") for d in range(s, s + rnd.randrange(16)))
+        path = os.path.join(self._tmpdir.name, "import_chunking.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("date,project,status\n")
+            for d, name in sorted(rows):
+                f.write(f"{cal_mod.jd_to_iso(lo + d)},{name},Fabrication\n")
+        first = self._import_sizes(path, sizes)
+        # iCalendar with SUMMARY / CATEGORIES folded over several lines; one
+        # chunk size puts a boundary exactly on the first continuation line
+        ics = ["BEGIN:VCALENDAR"]
+        for k in range(n):
+            day = cal_mod.jd_to_qdate(lo + rnd.randrange(60)).toString("yyyyMMdd")
+            ics += ["BEGIN:VEVENT", f"DTSTART;VALUE=DATE:{day}", f"SUMMARY:event {k} " + "x" * 60,
+                    " folded-part-" + "y" * 50, " and-more-" + "z" * 40,
+                    "CATEGORIES:" + "Extra,Tentative," * 3, " " + TYPES[k % len(TYPES)], "END:VEVENT"]
+        ics.append("END:VCALENDAR")
+        path = os.path.join(self._tmpdir.name, "import_chunking.ics")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("\r\n".join(ics) + "\r\n")
+        with open(path, "rb") as f:
+            on_fold = f.read().index(b"\r\n folded-part-") + 2
+        events = self._import_sizes(path, tuple(sizes) + (on_fold,))
+        assert len(events) == n and all(name.endswith("z" * 40) for name, *_ in events), events[:3]
+        return {"rows": len(rows), "records": len(first), "ics_events": len(events),
+                "chunk_sizes": list(sizes) + [on_fold]}
+
+    def _import_sizes(self, path, sizes):
+        """Records of path imported once per chunk size; asserts they all agree."""
+        saved = cal_mod.IMPORT_CHUNK_BYTES
+        results = {}
+        try:
+            for size in sizes:
+                cal_mod.IMPORT_CHUNK_BYTES = size
+                job = cal_mod.ScheduleImportThread(path, workers=1)
+                results[size] = sorted(r for batch in job._iter_batches() for r in batch)
+        finally:
+            cal_mod.IMPORT_CHUNK_BYTES = saved
+        first = results[sizes[0]]
+        assert all(r == first for r in results.values()), {k: len(v) for k, v in results.items()}
+        return first
+
+    def status_rollover_db(self, months_ahead=6):
+        """Midnight rollover on a database-backed calendar showing a later month:
+        the rollover scan must not move the store's window off the page."""
+        calendar = cal_mod.CustomCalendar()
+        db = cal_mod.ProjectDatabase(os.path.join(self._tmpdir.name, "rollover.sqlite3"))
+        today = calendar.status.today
+        db.add("ends today", "Fabrication", today - 3, today)
+        page = cal_mod.jd_to_qdate(today).addMonths(months_ahead)
+        calendar.set_database(db)
+        calendar.setCurrentPage(page.year(), page.month())
+        lo, hi = calendar.visible_range()
+        db.add("far job", "Installation", lo + 10, lo + 12)
+        calendar.store.load_window(*calendar.store.window)  # pick up the row added behind the store
+        before = [p.name for p in calendar.store.query(lo, hi)]
+        window = calendar.store.window
+        t0 = time.perf_counter()
+        changed = calendar.status.advance(today + 1)
+        elapsed = time.perf_counter() - t0
+        after = [p.name for p in calendar.store.query(lo, hi)]
+        assert after == before == ["far job"], (before, after)
+        assert calendar.store.window == window, (window, calendar.store.window)
+        assert [p.name for p in changed] == ["ends today"], changed
+        db.conn.close()
+        calendar.deleteLater()
+        return {"advance_ms": round(elapsed * 1000, 3), "changed": len(changed)}
+
+    def run(self):
+        results = {}
+        for fx in ("empty", "typical_4", "dense_9", "pathological_60"):
+            results[f"paint/{fx}"] = self.paint(fx)
+            results[f"month_switch/{fx}"] = self.month_switch(fx)
+        for fx in FIXTURES:
+            results[f"map_load/{fx}"] = self.map_load(fx)
+        results["store_query/decade_5000"] = self.store_query()
+        results["overview_scroll/decade_20000"] = self.overview_scroll()
+        results["recurring_pages/200_rules"] = self.recurring_pages()
+        results["search_index/50000"] = self.search_index()
+        results["workload/20000"] = self.workload()
+        results["range_label_edits/50000"] = self.range_label_edits()
+        results["journal/50000"] = self.journal()
+        results["day_detail/5000"] = self.day_detail()
+        results["window_drag/1000hz"] = self.window_drag()
+        results["memory/day_entries_1M"] = self.day_entry_memory()
+        for days in (31, 3653):
+            results[f"copy_selection/{days}d"] = self.copy_selection(days)
+            for mode in cal_mod.COPY_MODES[1:]:
+                results[f"copy_selection/{days}d_{mode}"] = self.copy_selection(days, mode)
+            results[f"export_csv/{days}d"] = self.export_csv(days)
+        results["export_csv/3653d_busy_only"] = self.export_csv(3653, only_with_projects=True)
+        results["import_csv/100000"] = self.import_csv(100000)
+        results["import_chunking"] = self.import_chunking()
+        results["status_rollover_db"] = self.status_rollover_db()
+        return results
+
+# -----------------------
+# Comparison against a previous run
+# -----------------------
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            yield from _flatten(v, key + ".")
+        elif isinstance(v, (int, float)) and (k.endswith("_ms") or k.endswith("_bytes") or k.endswith("_us")):
+            yield key, v
+
+
+def compare(old, new, threshold):
+    """Print metric ratios new/old; return the number of regressions above threshold."""
+    old_m = dict(_flatten(old["results"]))
+    regressions = 0
+    for key, value in _flatten(new["results"]):
+        base = old_m.get(key)
+        if not base:
+            continue
+        ratio = value / base
+        flag = ""
+        if ratio > threshold and not key.endswith(".min_ms"):
+            flag = "  <-- regression"
+            regressions += 1
+        print(f"{key:60s} {base:>12.3f} -> {value:>12.3f}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless floating calendar benchmarks")
+    ap.add_argument("-o", "--output", default=os.path.join(HERE, "bench_results.json"))
+    ap.add_argument("--frames", type=int, default=60, help="frames per paint / month-switch sample")
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio flagged as regression")
+    args = ap.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    t0 = time.perf_counter()
+    results = Bench(app, args.frames).run()
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": QApplication.platformName(),
+            "wall_s": round(time.perf_counter() - t0, 3),
+            "max_rss_kb": max_rss_kb(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        sys.exit(1 if compare(old, report, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()